@@ -0,0 +1,452 @@
+"""
+Container-agnostic PCM frame sources and sinks with the ``wave`` module's reader and writer interface.
+
+WAV, RF64, AIFF/AIFC and headerless raw PCM are supported. Frames are always exchanged in WAV
+layout (little-endian samples, 8-bit samples unsigned), so the algorithms see the same bytes
+whatever the container, and files and unseekable streams such as pipes are read front to back.
+"""
+import builtins
+import os
+import struct
+from collections import namedtuple
+
+# Frames and sample layout of an open source; ``container`` names the format it was read from
+AudioParams = namedtuple("AudioParams", "nchannels sampwidth framerate nframes comptype compname container")
+
+CONTAINER_WAV = "wav"
+CONTAINER_RF64 = "rf64"
+CONTAINER_AIFF = "aiff"
+CONTAINER_RAW = "raw"
+
+# Output containers chosen by file extension; other outputs keep the container of their source
+EXTENSION_CONTAINERS = {
+    ".wav": CONTAINER_WAV,
+    ".wave": CONTAINER_WAV,
+    ".rf64": CONTAINER_RF64,
+    ".aif": CONTAINER_AIFF,
+    ".aiff": CONTAINER_AIFF,
+    ".aifc": CONTAINER_AIFF,
+    ".raw": CONTAINER_RAW,
+    ".pcm": CONTAINER_RAW,
+}
+
+# Layout of headerless PCM as "channels,sample width in bytes,frame rate"
+RAW_FORMAT_ENV_VAR = "STEGANOGRAPHY_RAW_FORMAT"
+DEFAULT_RAW_FORMAT = "2,2,44100"
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+RIFF_HEADER_BYTES = 44  # RIFF, fmt and data chunk headers of a plain PCM file
+RF64_HEADER_BYTES = 80  # The same plus the ds64 chunk
+UNKNOWN_SIZE = 0xFFFFFFFF  # 32-bit size field of RF64 files and of WAV streams of unknown length
+
+# Flips the sign bit, converting between signed (AIFF) and unsigned (WAV) 8-bit samples
+SIGN_FLIP = bytes(value ^ 0x80 for value in range(256))
+
+def raw_format():
+    """
+    Returns the layout assumed for headerless PCM, from the STEGANOGRAPHY_RAW_FORMAT environment variable.
+
+    :return: Tuple of (channels, sample width in bytes, frame rate)
+    """
+    text = os.environ.get(RAW_FORMAT_ENV_VAR) or DEFAULT_RAW_FORMAT
+    try:
+        nchannels, sampwidth, framerate = (int(part) for part in text.split(","))
+    except ValueError:
+        raise ValueError(f"{RAW_FORMAT_ENV_VAR} must look like '{DEFAULT_RAW_FORMAT}', not {text!r}.") from None
+    return nchannels, sampwidth, framerate
+
+def swap_byte_order(data, sampwidth):
+    """
+    Reverses the byte order of every sample.
+
+    :param data: Frame bytes
+    :param sampwidth: Sample width in bytes
+    :return: bytearray with big-endian samples turned little-endian or vice versa
+    """
+    data = bytes(data)  # NumPy arrays do not support strided slice assignment into a bytearray
+    swapped = bytearray(len(data))
+    for i in range(sampwidth):
+        swapped[i::sampwidth] = data[sampwidth - 1 - i::sampwidth]
+    return swapped
+
+def read_extended(data):
+    """Converts an 80-bit IEEE 754 extended float, as used for the AIFF sample rate, to a number."""
+    exponent, mantissa = struct.unpack('>HQ', data)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+def write_extended(value):
+    """Converts a non-negative number to an 80-bit IEEE 754 extended float."""
+    if value <= 0:
+        return bytes(10)
+    exponent = 16383 + 63
+    mantissa = float(value)
+    while mantissa < 1 << 63:
+        mantissa *= 2
+        exponent -= 1
+    while mantissa >= 1 << 64:
+        mantissa /= 2
+        exponent += 1
+    return struct.pack('>HQ', exponent, int(mantissa))
+
+class FrameSource:
+    """
+    Reads PCM frames from a container, with the methods of ``wave.Wave_read`` the algorithms use.
+
+    :param file: Binary file object positioned at the start of the container
+    :param own_file: Close ``file`` when the source is closed
+    :param name: File name, consulted for raw PCM extensions
+    """
+
+    def __init__(self, file, own_file=False, name=None):
+        self._file = file
+        self._own_file = own_file
+        self._seekable = file.seekable()
+        self._start = file.tell() if self._seekable else 0
+        self._prefix = b''  # Bytes read while sniffing that belong to the audio data of raw PCM
+        self._position = 0
+        self._big_endian = self._signed_8bit = False
+        magic = self._read_exactly(12, allow_short=True)
+        if magic[:4] in (b'RIFF', b'RF64') and magic[8:12] == b'WAVE':
+            self._parse_riff(magic)
+        elif magic[:4] == b'FORM' and magic[8:12] in (b'AIFF', b'AIFC'):
+            self._parse_aiff(magic)
+        elif os.path.splitext(name or "")[1].lower() in (".raw", ".pcm") or os.environ.get(RAW_FORMAT_ENV_VAR):
+            self._prefix = magic
+            self._data_offset = self._start
+            self._nchannels, self._sampwidth, self._framerate = raw_format()
+            self._container = CONTAINER_RAW
+            self._data_size = self._stream_size(self._start)
+            if self._seekable:
+                self._file.seek(self._start)
+                self._prefix = b''
+        else:
+            raise ValueError("Unrecognized audio format; raw PCM needs a .raw/.pcm name or STEGANOGRAPHY_RAW_FORMAT.")
+
+        self._frame_size = self._nchannels * self._sampwidth
+        if self._frame_size <= 0:
+            raise ValueError("The audio has no channels or samples.")
+        self._nframes = None if self._data_size is None else self._data_size // self._frame_size
+
+    def _read_exactly(self, count, allow_short=False):
+        pieces = [self._prefix[:count]]
+        self._prefix = self._prefix[count:]
+        missing = count - len(pieces[0])
+        while missing:
+            chunk = self._file.read(missing)
+            if not chunk:
+                if allow_short:
+                    break
+                raise ValueError("The audio file is truncated.")
+            pieces.append(chunk)
+            missing -= len(chunk)
+        return pieces[0] if len(pieces) == 1 else b''.join(pieces)
+
+    def _skip(self, count):
+        if self._seekable:
+            self._file.seek(count, os.SEEK_CUR)
+        else:
+            while count:
+                count -= len(self._read_exactly(min(count, 1 << 16)))
+
+    def _stream_size(self, offset):
+        """Returns how many bytes follow ``offset``, or None for an unseekable stream."""
+        if not self._seekable:
+            return None
+        return max(0, self._file.seek(0, os.SEEK_END) - offset)
+
+    def _parse_riff(self, magic):
+        rf64_data_size = None
+        self._data_size = None
+        self._sampwidth = None
+        while True:
+            header = self._read_exactly(8)
+            chunk_id, chunk_size = header[:4], struct.unpack('<I', header[4:])[0]
+            if chunk_id == b'ds64':
+                body = self._read_exactly(chunk_size)
+                rf64_data_size = struct.unpack('<Q', body[8:16])[0]
+                self._skip(chunk_size & 1)
+            elif chunk_id == b'fmt ':
+                body = self._read_exactly(chunk_size)
+                format_tag, self._nchannels, self._framerate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    format_tag = struct.unpack('<H', body[24:26])[0]  # First field of the sub-format GUID
+                if format_tag != WAVE_FORMAT_PCM:
+                    raise ValueError(f"Unsupported WAV format tag 0x{format_tag:04x}; only PCM is supported.")
+                self._sampwidth = (bits + 7) // 8
+                self._skip(chunk_size & 1)
+            elif chunk_id == b'data':
+                if self._sampwidth is None:
+                    raise ValueError("The WAV data chunk precedes its fmt chunk.")
+                self._data_offset = self._file.tell() - len(self._prefix) if self._seekable else None
+                if magic[:4] == b'RF64' and chunk_size == UNKNOWN_SIZE and rf64_data_size is not None:
+                    self._data_size = rf64_data_size
+                elif chunk_size == UNKNOWN_SIZE:  # Written to a stream before its length was known
+                    self._data_size = self._stream_size(self._data_offset)
+                else:
+                    self._data_size = chunk_size
+                if self._seekable and self._data_size is not None:
+                    self._file.seek(self._data_offset)
+                self._container = CONTAINER_RF64 if magic[:4] == b'RF64' else CONTAINER_WAV
+                return
+            else:
+                self._skip(chunk_size + (chunk_size & 1))
+
+    def _parse_aiff(self, magic):
+        self._container = CONTAINER_AIFF
+        self._big_endian = True
+        common = sound_offset = None
+        sound_found = False
+        while common is None or not sound_found:
+            header = self._read_exactly(8)
+            chunk_id, chunk_size = header[:4], struct.unpack('>I', header[4:])[0]
+            if chunk_id == b'COMM':
+                common = self._read_exactly(chunk_size)
+                self._skip(chunk_size & 1)
+            elif chunk_id == b'SSND':
+                offset, _ = struct.unpack('>II', self._read_exactly(8))
+                self._skip(offset)
+                sound_found = True
+                self._data_size = chunk_size - 8 - offset
+                if common is None:
+                    # COMM may follow SSND; remember where the samples start and come back for them
+                    if not self._seekable:
+                        raise ValueError("The AIFF COMM chunk follows the sound data, which needs a seekable file.")
+                    sound_offset = self._file.tell()
+                    self._skip(self._data_size + (chunk_size & 1))
+                else:
+                    sound_offset = self._file.tell() if self._seekable else None
+            else:
+                self._skip(chunk_size + (chunk_size & 1))
+
+        self._nchannels, nframes, bits = struct.unpack('>hIh', common[:8])
+        self._framerate = int(round(read_extended(common[8:18])))
+        if magic[8:12] == b'AIFC':
+            compression = common[18:22]
+            if compression == b'sowt':  # Little-endian samples
+                self._big_endian = False
+            elif compression not in (b'NONE', b'twos'):
+                raise ValueError(f"Unsupported AIFF-C compression {compression!r}.")
+        self._sampwidth = (bits + 7) // 8
+        self._signed_8bit = True
+        self._data_size = min(self._data_size, nframes * self._nchannels * self._sampwidth)
+        self._data_offset = sound_offset
+        if self._seekable:
+            self._file.seek(sound_offset)
+
+    def getnchannels(self):
+        return self._nchannels
+
+    def getsampwidth(self):
+        return self._sampwidth
+
+    def getframerate(self):
+        return self._framerate
+
+    def getnframes(self):
+        """Returns the number of frames, or None for a stream whose length is not known up front."""
+        return self._nframes
+
+    def getcontainer(self):
+        return self._container
+
+    def getparams(self):
+        return AudioParams(self._nchannels, self._sampwidth, self._framerate, self._nframes, 'NONE', 'not compressed', self._container)
+
+    def readframes(self, nframes):
+        """
+        Reads the next frames in WAV layout.
+
+        :param nframes: Maximum number of frames to read
+        :return: Frame bytes, empty at the end of the audio
+        """
+        if self._nframes is not None:
+            nframes = min(nframes, self._nframes - self._position)
+        if nframes <= 0:
+            return b''
+        data = self._read_exactly(nframes * self._frame_size, allow_short=True)
+        data = data[:len(data) - len(data) % self._frame_size]
+        self._position += len(data) // self._frame_size
+        if self._big_endian and self._sampwidth > 1:
+            data = swap_byte_order(data, self._sampwidth)
+        if self._signed_8bit and self._sampwidth == 1:
+            data = data.translate(SIGN_FLIP)
+        return bytes(data) if isinstance(data, bytearray) else data
+
+    def setpos(self, position):
+        """Moves to a frame; needs a seekable file unless the position does not change."""
+        if position == self._position:
+            return
+        if not self._seekable:
+            raise ValueError("The audio source is a stream and cannot be repositioned.")
+        if position < 0 or (self._nframes is not None and position > self._nframes):
+            raise ValueError("Position out of range.")
+        self._file.seek(self._data_offset + position * self._frame_size)
+        self._prefix = b''
+        self._position = position
+
+    def seekable(self):
+        """Whether ``setpos`` can move to any frame."""
+        return self._seekable
+
+    def rewind(self):
+        self.setpos(0)
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if self._own_file and self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FrameSink:
+    """
+    Writes PCM frames into a container, with the methods of ``wave.Wave_write`` the algorithms use.
+
+    The header is written before the first frames using the frame count from ``setparams``, so
+    streams need no seeking when that count is right. Seekable files get their header corrected
+    on close if it was not, and WAV output too large for 32-bit sizes is written as RF64.
+
+    :param file: Writable binary file object
+    :param container: Container to write, or None to use the one in the params passed to ``setparams``
+    :param own_file: Close ``file`` when the sink is closed
+    """
+
+    def __init__(self, file, container=None, own_file=False):
+        self._file = file
+        self._container = container
+        self._own_file = own_file
+        self._params = None
+        self._header_written = False
+        self._frames_written = 0
+        self._header_frames = None
+
+    def setparams(self, params):
+        """Sets the layout of the frames to write from a ``getparams`` tuple of a source or of ``wave``."""
+        if self._header_written:
+            raise ValueError("Cannot change the parameters after frames have been written.")
+        self._params = params
+        if self._container is None:
+            self._container = getattr(params, "container", CONTAINER_WAV)
+
+    def _frame_size(self):
+        return self._params[0] * self._params[1]
+
+    def _header(self, nframes):
+        nchannels, sampwidth, framerate = self._params[:3]
+        data_size = None if nframes is None else nframes * nchannels * sampwidth
+        container = self._container
+        if container == CONTAINER_WAV and data_size is not None and data_size > UNKNOWN_SIZE - RIFF_HEADER_BYTES:
+            container = CONTAINER_RF64
+        self._written_container = container
+
+        if container == CONTAINER_RAW:
+            return b''
+        fmt = struct.pack('<4sIHHIIHH', b'fmt ', 16, WAVE_FORMAT_PCM, nchannels, framerate,
+                          framerate * nchannels * sampwidth, nchannels * sampwidth, sampwidth * 8)
+        if container == CONTAINER_WAV:
+            size = UNKNOWN_SIZE if data_size is None else data_size
+            riff_size = UNKNOWN_SIZE if data_size is None else RIFF_HEADER_BYTES - 8 + data_size
+            return struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE') + fmt + struct.pack('<4sI', b'data', size)
+        if container == CONTAINER_RF64:
+            data_size = data_size or 0
+            ds64 = struct.pack('<4sIQQQI', b'ds64', 28, RF64_HEADER_BYTES - 8 + data_size + (data_size & 1), data_size, nframes or 0, 0)
+            return struct.pack('<4sI4s', b'RF64', UNKNOWN_SIZE, b'WAVE') + ds64 + fmt + struct.pack('<4sI', b'data', UNKNOWN_SIZE)
+        if container == CONTAINER_AIFF:
+            data_size = data_size or 0
+            common = struct.pack('>4sIhIh', b'COMM', 18, nchannels, nframes or 0, sampwidth * 8) + write_extended(framerate)
+            sound = struct.pack('>4sIII', b'SSND', 8 + data_size, 0, 0)
+            return struct.pack('>4sI4s', b'FORM', 4 + len(common) + len(sound) + data_size + (data_size & 1), b'AIFF') + common + sound
+        raise ValueError(f"Unknown audio container {container!r}.")
+
+    def _write_header(self):
+        if self._params is None:
+            raise ValueError("The audio parameters were not set.")
+        self._header_frames = self._params[3]
+        self._file.write(self._header(self._header_frames))
+        self._header_written = True
+
+    def writeframesraw(self, data):
+        """Writes frames given in WAV layout."""
+        if not self._header_written:
+            self._write_header()
+        if self._written_container == CONTAINER_AIFF:
+            sampwidth = self._params[1]
+            data = bytes(data).translate(SIGN_FLIP) if sampwidth == 1 else swap_byte_order(data, sampwidth)
+        self._file.write(data)
+        self._frames_written += len(data) // self._frame_size()
+
+    def writeframes(self, data):
+        self.writeframesraw(data)
+
+    def close(self):
+        """Pads the last chunk, corrects the header of seekable files if the frame count changed, and closes."""
+        if self._file is None:
+            return
+        try:
+            if not self._header_written:
+                self._write_header()
+            data_size = self._frames_written * self._frame_size()
+            if data_size & 1 and self._written_container != CONTAINER_RAW:
+                self._file.write(b'\x00')
+            if self._frames_written != self._header_frames and self._written_container != CONTAINER_RAW:
+                if not self._file.seekable():
+                    if self._header_frames is not None:
+                        raise ValueError("Fewer or more frames were written to the stream than its header announced.")
+                else:
+                    end = self._file.tell()
+                    header = self._header(self._frames_written)
+                    if len(header) != len(self._header(self._header_frames)):
+                        raise ValueError("The audio grew beyond the 4 GiB WAV limit; write it to an .rf64 file.")
+                    self._file.seek(end - data_size - (data_size & 1) - len(header))
+                    self._file.write(header)
+                    self._file.seek(end)
+            self._file.flush()
+        finally:
+            if self._own_file:
+                self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_audio(file, mode='rb'):
+    """
+    Opens an audio container for reading or writing, like ``wave.open``.
+
+    :param file: Path or binary file object (e.g. ``sys.stdin.buffer``); open sources are returned unchanged
+    :param mode: 'rb' to read frames, 'wb' to write them
+    :return: A FrameSource or FrameSink
+    """
+    if mode in ('r', 'rb'):
+        if isinstance(file, FrameSource):
+            return file
+        if hasattr(file, 'read'):
+            name = getattr(file, 'name', None)
+            return FrameSource(file, name=name if isinstance(name, str) else None)
+        handle = builtins.open(file, 'rb')
+        try:
+            return FrameSource(handle, own_file=True, name=os.fspath(file))
+        except Exception:
+            handle.close()
+            raise
+    if mode in ('w', 'wb'):
+        if hasattr(file, 'write'):
+            return FrameSink(file)
+        container = EXTENSION_CONTAINERS.get(os.path.splitext(os.fspath(file))[1].lower())
+        return FrameSink(builtins.open(file, 'wb'), container, own_file=True)
+    raise ValueError("mode must be 'rb' or 'wb'")
@@ -0,0 +1,308 @@
+"""Shared NumPy bit-packing core used by the LSB steganography algorithms."""
+import struct  # For packing and unpacking the message length
+import zlib
+
+import numpy as np
+
+from algorithms import ecc
+from algorithms.payload import (
+    CODEC_RAW,
+    CHECKSUM_BYTES,
+    FORMAT_VERSION,
+    MAX_HEADER_BYTES,
+    checksum,
+    pack_payload,
+    payload_header,
+    parse_payload_header,
+    unpack_payload,
+)
+from utils.metrics import METRICS
+
+# Payloads written before the payload container start with a 32-bit big-endian bit length
+LENGTH_HEADER_BITS = 32
+
+# Bits to read before the payload length is known; covers both header layouts and the ECC frame header
+HEADER_READ_BITS = max(MAX_HEADER_BYTES * 8, ecc.FRAME_HEADER_BITS)
+
+# Bytes of a payload file read and expanded into bits at a time
+PAYLOAD_CHUNK_BYTES = 1 << 20
+
+def message_to_bits(secret_message, protect=None):
+    """
+    Converts a secret message into the bits of its payload container.
+
+    :param secret_message: The message to be converted
+    :param protect: Wrap the payload in the ECC frame (defaults to the STEGANOGRAPHY_ECC environment variable)
+    :return: uint8 array holding one bit (0 or 1) per element
+    """
+    payload = pack_payload(secret_message.encode('utf-8'))
+    if ecc.use_ecc(protect):
+        return ecc.protect(payload)
+    return np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+
+def message_bit_length(secret_message, protect=None):
+    """
+    Returns the number of bits a message occupies in the carrier, including the payload header.
+
+    :param secret_message: The message to be measured
+    :param protect: Count the ECC frame (defaults to the STEGANOGRAPHY_ECC environment variable)
+    :return: The payload length in bits
+    """
+    payload_bytes = len(pack_payload(secret_message.encode('utf-8')))
+    if ecc.use_ecc(protect):
+        return ecc.frame_bits(payload_bytes)
+    return payload_bytes * 8
+
+def bits_to_length(bits):
+    """
+    Converts the 32 bits of a legacy header back into the message length.
+
+    :param bits: uint8 array of 32 bits
+    :return: The message length in bits
+    """
+    return struct.unpack('>I', np.packbits(bits).tobytes())[0]
+
+def payload_layout(header_bits):
+    """
+    Parses the header of an embedded payload.
+
+    :param header_bits: The first HEADER_READ_BITS extracted bits, or all of them if the carrier is smaller
+    :return: Tuple of (codec id, header length in bits, stored data length in bits, checksum length in bits)
+    """
+    if len(header_bits) < 8:
+        raise ValueError("The audio data is too short to hold a payload header.")
+    if ecc.is_protected(header_bits):
+        raise ValueError("ECC-protected payloads hold messages, not files.")
+    if not header_bits[0]:  # Legacy 32-bit length header followed by uncompressed bytes
+        if len(header_bits) < LENGTH_HEADER_BITS:
+            raise ValueError("The audio data is too short to hold a message length.")
+        return CODEC_RAW, LENGTH_HEADER_BITS, bits_to_length(header_bits[:LENGTH_HEADER_BITS]), 0
+    whole_bytes = len(header_bits) - len(header_bits) % 8
+    codec, header_size, length, checksum_size = parse_payload_header(np.packbits(header_bits[:whole_bytes]).tobytes())
+    return codec, header_size * 8, length * 8, checksum_size * 8
+
+def payload_length_bits(header_bits):
+    """
+    Returns how many bits the embedded payload occupies, header included.
+
+    :param header_bits: The first HEADER_READ_BITS extracted bits, or all of them if the carrier is smaller
+    :return: The payload length in bits
+    """
+    if ecc.is_protected(header_bits):
+        return ecc.protected_length_bits(header_bits)
+    _, header_length, data_length, checksum_length = payload_layout(header_bits)
+    return header_length + data_length + checksum_length
+
+def payload_checked(header_bits):
+    """
+    Tells whether an embedded payload carries a checksum, so decoding it proves a message is present.
+
+    ECC frames count as checked: their codewords detect damage the code cannot correct.
+
+    :param header_bits: The first HEADER_READ_BITS extracted bits
+    :return: True for ECC frames and checksummed containers, False for older payloads
+    """
+    if ecc.is_protected(header_bits):
+        return True
+    return len(header_bits) >= 8 and int(np.packbits(header_bits[:8])[0]) == FORMAT_VERSION
+
+def bits_to_message(bits):
+    """
+    Converts the bits of an embedded payload back into the message.
+
+    :param bits: uint8 array of payload bits, header included
+    :return: The decoded message
+    """
+    if ecc.is_protected(bits):
+        payload, stats = ecc.unprotect(bits)
+        METRICS.add("ecc", "codewords", stats["codewords"])
+        METRICS.add("ecc", "corrected_codewords", stats["corrected"])
+        METRICS.add("ecc", "uncorrectable_codewords", stats["uncorrectable"])
+        METRICS.add("ecc", "header_bits_outvoted", stats["header_bits_outvoted"])
+        return unpack_payload(payload).decode('utf-8')
+    if not bits[0]:  # Legacy payload: eight bits per character after the 32-bit length
+        message_length = bits_to_length(bits[:LENGTH_HEADER_BITS])
+        return np.packbits(bits[LENGTH_HEADER_BITS:LENGTH_HEADER_BITS + message_length]).tobytes().decode('latin-1')
+    return unpack_payload(np.packbits(bits).tobytes()).decode('utf-8')
+
+def file_payload_bit_length(size):
+    """
+    Returns the number of bits a binary file occupies in the carrier, including the payload header.
+
+    :param size: Size of the file in bytes
+    :return: The payload length in bits
+    """
+    return (len(payload_header(CODEC_RAW, size)) + size + CHECKSUM_BYTES) * 8
+
+def file_payload_bits(payload_file, size, chunk_bytes=PAYLOAD_CHUNK_BYTES):
+    """
+    Expands a binary file into the bits of an uncompressed payload container one chunk at a time.
+
+    :param payload_file: Binary file object positioned at the first payload byte
+    :param size: Number of bytes to read from the file
+    :param chunk_bytes: Number of file bytes expanded per chunk
+    :return: Generator of uint8 bit arrays, the header first and the checksum last
+    """
+    yield np.unpackbits(np.frombuffer(payload_header(CODEC_RAW, size), dtype=np.uint8))
+    remaining = size
+    crc = 0
+    while remaining:
+        data = payload_file.read(min(chunk_bytes, remaining))
+        if not data:
+            raise ValueError("The payload file ended before its expected size.")
+        remaining -= len(data)
+        crc = zlib.crc32(data, crc)
+        yield np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    yield np.unpackbits(np.frombuffer(checksum(b'', crc), dtype=np.uint8))
+
+class BitStream:
+    """Serves bits in pieces of any size from an iterable of bit arrays, holding at most one chunk ahead."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = np.empty(0, dtype=np.uint8)
+
+    def read(self, count):
+        """
+        Reads the next bits of the stream.
+
+        :param count: Number of bits wanted
+        :return: uint8 array of ``count`` bits, or fewer if the stream ends first
+        """
+        pieces = [self._pending]
+        available = len(self._pending)
+        while available < count:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            pieces.append(chunk)
+            available += len(chunk)
+        bits = np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+        self._pending = bits[count:]
+        return bits[:count]
+
+    def unread(self, bits):
+        """
+        Pushes bits back so the next ``read`` returns them first.
+
+        :param bits: uint8 array of bits
+        """
+        self._pending = np.concatenate([bits, self._pending])
+
+def frames_to_array(frames):
+    """
+    Wraps raw frame bytes in a writable uint8 array without copying them again.
+
+    :param frames: Bytes returned by ``readframes``
+    :return: Writable uint8 array over the frame bytes
+    """
+    return np.frombuffer(bytearray(frames), dtype=np.uint8)
+
+def sample_lsb_view(frame_bytes, sampwidth):
+    """
+    Returns a writable view of the least significant byte of every little-endian PCM sample.
+
+    Works for any sample width (8, 16, 24 or 32 bit) across all channels, since WAV stores
+    samples little-endian and the first byte of each sample holds its low-order bits.
+
+    :param frame_bytes: uint8 array of frame bytes
+    :param sampwidth: Sample width in bytes
+    :return: uint8 view with one element per sample
+    """
+    whole_samples = len(frame_bytes) - len(frame_bytes) % sampwidth
+    return frame_bytes[:whole_samples].reshape(-1, sampwidth)[:, 0]
+
+def carrier_bytes(frame_bytes, sampwidth, per_sample):
+    """
+    Selects the bytes that carry payload bits.
+
+    :param frame_bytes: uint8 array of frame bytes
+    :param sampwidth: Sample width in bytes
+    :param per_sample: Use only the least significant byte of each sample instead of every byte
+    :return: uint8 array or view of carrier bytes
+    """
+    return sample_lsb_view(frame_bytes, sampwidth) if per_sample else frame_bytes
+
+def pairs_to_values(bits):
+    """
+    Converts bit pairs into the values stored in the 3rd and 4th LSB of a byte.
+
+    :param bits: uint8 array with an even number of bits
+    :return: uint8 array of values in {0, 4, 8, 12}
+    """
+    pairs = bits.reshape(-1, 2)
+    return (pairs[:, 0] << 3) | (pairs[:, 1] << 2)
+
+def embed_lsb(frame_bytes, bits, offset=0):
+    """
+    Writes one bit into the least significant bit of each carrier byte.
+
+    :param frame_bytes: Writable uint8 array of carrier bytes
+    :param bits: uint8 array of bits to embed
+    :param offset: Index of the first carrier byte to modify
+    """
+    region = frame_bytes[offset:offset + bits.size]
+    region &= 254
+    region |= bits
+
+def extract_lsb(frame_bytes, count, offset=0):
+    """
+    Reads one bit from the least significant bit of each carrier byte.
+
+    :param frame_bytes: uint8 array of carrier bytes
+    :param count: Number of bits to read
+    :param offset: Index of the first carrier byte to read
+    :return: uint8 array of extracted bits
+    """
+    return frame_bytes[offset:offset + count] & 1
+
+def embed_pairs(frame_bytes, bits, offset=0):
+    """
+    Writes two bits into the 3rd and 4th LSB of each carrier byte.
+
+    :param frame_bytes: Writable uint8 array of carrier bytes
+    :param bits: uint8 array with an even number of bits to embed
+    :param offset: Index of the first carrier byte to modify
+    """
+    values = pairs_to_values(bits)
+    region = frame_bytes[offset:offset + values.size]
+    region &= 243  # Clear the 3rd and 4th LSB
+    region |= values
+
+def extract_pairs(frame_bytes, count, offset=0):
+    """
+    Reads two bits from the 3rd and 4th LSB of each carrier byte.
+
+    :param frame_bytes: uint8 array of carrier bytes
+    :param count: Number of carrier bytes to read
+    :param offset: Index of the first carrier byte to read
+    :return: uint8 array of ``2 * count`` extracted bits
+    """
+    region = frame_bytes[offset:offset + count]
+    bits = np.empty(region.size * 2, dtype=np.uint8)
+    bits[0::2] = (region >> 3) & 1
+    bits[1::2] = (region >> 2) & 1
+    return bits
+
+def embed_pairs_with_flip(frame_bytes, bits, offset=0):
+    """
+    Writes two bits into the 3rd and 4th LSB of each carrier byte, flipping the two
+    least significant bits of every byte whose stored pair has to change.
+
+    :param frame_bytes: Writable uint8 array of carrier bytes
+    :param bits: uint8 array with an even number of bits to embed
+    :param offset: Index of the first carrier byte to modify
+    """
+    values = pairs_to_values(bits)
+    region = frame_bytes[offset:offset + values.size]
+
+    # Branch-free flip mask: 3 where the stored pair differs from the new pair, 0 elsewhere
+    flip = (region ^ values) & 12
+    flip |= flip >> 1
+    flip >>= 2
+    flip &= 1
+    flip *= 3
+
+    region ^= flip
+    region &= 243  # Clear the 3rd and 4th LSB
+    region |= values
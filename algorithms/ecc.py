@@ -0,0 +1,172 @@
+"""Optional error-correcting frame around a payload: interleaved SECDED Hamming(13,8) codewords with table-driven decoding."""
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from utils.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+# Set to 1 to wrap every encoded payload in the ECC frame
+ECC_ENV_VAR = "STEGANOGRAPHY_ECC"
+
+# The frame header is a marker byte and a 32-bit byte count, each bit repeated three times.
+# A plain payload starts with bits 10 and a legacy one with 0, while the marker starts with 11.
+ECC_MARKER = 0xEC
+REPETITION = 3
+FRAME_HEADER_BITS = (8 + 32) * REPETITION
+
+# Hamming(12,8) plus an overall parity bit: corrects one and detects two bit errors per byte
+CODEWORD_BITS = 13
+DATA_POSITIONS = (3, 5, 6, 7, 9, 10, 11, 12)  # Positions 1, 2, 4 and 8 hold parity, 0 the overall parity
+
+STATUS_OK = 0
+STATUS_CORRECTED = 1
+STATUS_UNCORRECTABLE = 2
+
+CODEWORD_SHIFTS = np.arange(CODEWORD_BITS - 1, -1, -1, dtype=np.uint16)
+
+def use_ecc(ecc=None):
+    """Returns whether payloads are protected: ``ecc`` if given, else the STEGANOGRAPHY_ECC environment variable."""
+    if ecc is None:
+        return os.environ.get(ECC_ENV_VAR, "").lower() in ("1", "true", "yes")
+    return ecc
+
+def codeword_bits(codeword):
+    """Returns the 13 bits of a codeword as a list, position 0 first."""
+    return [(codeword >> (CODEWORD_BITS - 1 - position)) & 1 for position in range(CODEWORD_BITS)]
+
+def encode_byte(value):
+    """
+    Encodes one byte as a SECDED codeword.
+
+    :param value: Byte value
+    :return: 13-bit codeword with position 0 in the most significant bit
+    """
+    bits = [0] * CODEWORD_BITS
+    for i, position in enumerate(DATA_POSITIONS):
+        bits[position] = (value >> (7 - i)) & 1
+    for parity in (1, 2, 4, 8):
+        bits[parity] = sum(bits[position] for position in range(1, CODEWORD_BITS) if position & parity and position != parity) & 1
+    bits[0] = sum(bits[1:]) & 1
+    return int("".join(map(str, bits)), 2)
+
+@lru_cache(maxsize=None)
+def encode_table():
+    """Returns the uint16 codeword of every byte value."""
+    return np.array([encode_byte(value) for value in range(256)], dtype=np.uint16)
+
+@lru_cache(maxsize=None)
+def decode_tables():
+    """
+    Returns the corrected byte and status of every possible received 13-bit word.
+
+    :return: Tuple of (uint8 array of bytes, uint8 array of STATUS_* values), both indexed by the received word
+    """
+    data = np.empty(1 << CODEWORD_BITS, dtype=np.uint8)
+    status = np.empty(1 << CODEWORD_BITS, dtype=np.uint8)
+    for word in range(1 << CODEWORD_BITS):
+        bits = codeword_bits(word)
+        syndrome = 0
+        for position in range(1, CODEWORD_BITS):
+            if bits[position]:
+                syndrome ^= position
+        parity = sum(bits) & 1
+
+        if parity and syndrome < CODEWORD_BITS:  # Single error, at ``syndrome`` (0 is the overall parity bit)
+            bits[syndrome] ^= 1
+            status[word] = STATUS_CORRECTED
+        elif syndrome or parity:  # Two errors, or more than the code can tell apart
+            status[word] = STATUS_UNCORRECTABLE
+        else:
+            status[word] = STATUS_OK
+        data[word] = sum(bits[position] << (7 - i) for i, position in enumerate(DATA_POSITIONS))
+    return data, status
+
+def frame_bits(length):
+    """Returns the bits of a frame holding ``length`` payload bytes, padded to whole bytes like a plain payload."""
+    bits = FRAME_HEADER_BITS + length * CODEWORD_BITS
+    return bits + -bits % 8
+
+def protect(data):
+    """
+    Wraps payload bytes in the ECC frame.
+
+    Codeword bits are interleaved across the whole payload (bit 0 of every codeword, then bit 1, ...),
+    so a burst of consecutive damaged carrier positions hits each codeword at most once.
+
+    :param data: Payload bytes
+    :return: uint8 array of frame bits, zero-padded to whole bytes
+    """
+    header = np.unpackbits(np.frombuffer(struct.pack('>BI', ECC_MARKER, len(data)), dtype=np.uint8))
+    codewords = encode_table()[np.frombuffer(data, dtype=np.uint8)]
+    bits = ((codewords[:, None] >> CODEWORD_SHIFTS) & 1).astype(np.uint8)
+    padding = np.zeros(frame_bits(len(data)) - FRAME_HEADER_BITS - bits.size, dtype=np.uint8)
+    return np.concatenate([np.repeat(header, REPETITION), bits.T.ravel(), padding])
+
+def read_frame_header(header_bits):
+    """
+    Majority-decodes the repeated frame header.
+
+    :param header_bits: The first FRAME_HEADER_BITS frame bits
+    :return: Tuple of (marker, payload byte count, number of header bits outvoted)
+    """
+    votes = header_bits[:FRAME_HEADER_BITS].reshape(-1, REPETITION).sum(axis=1)
+    bits = (votes * 2 > REPETITION).astype(np.uint8)
+    outvoted = int(np.count_nonzero((votes != 0) & (votes != REPETITION)))
+    marker, length = struct.unpack('>BI', np.packbits(bits).tobytes())
+    return marker, length, outvoted
+
+def is_protected(header_bits):
+    """
+    Tells an ECC frame apart from a plain or legacy payload.
+
+    :param header_bits: The first extracted bits
+    :return: True if the bits start with the (majority-decoded) ECC marker
+    """
+    if len(header_bits) < 8 * REPETITION:
+        return False
+    votes = header_bits[:8 * REPETITION].reshape(-1, REPETITION).sum(axis=1)
+    marker = int(np.packbits((votes * 2 > REPETITION).astype(np.uint8))[0])
+    return marker == ECC_MARKER
+
+def protected_length_bits(header_bits):
+    """
+    Returns how many bits an ECC frame occupies, header included.
+
+    :param header_bits: At least the first FRAME_HEADER_BITS frame bits
+    :return: The frame length in bits
+    """
+    if len(header_bits) < FRAME_HEADER_BITS:
+        raise ValueError("The audio data is too short to hold an ECC frame header.")
+    _, length, _ = read_frame_header(header_bits)
+    return frame_bits(length)
+
+def unprotect(bits):
+    """
+    Decodes an ECC frame, correcting one bit error per codeword with a single table lookup per byte.
+
+    :param bits: uint8 array holding the whole frame
+    :return: Tuple of (payload bytes, dictionary with the codeword count, corrected and uncorrectable codewords
+             and outvoted header bits)
+    """
+    _, length, outvoted = read_frame_header(bits)
+    if len(bits) < FRAME_HEADER_BITS + length * CODEWORD_BITS:
+        raise ValueError("The ECC frame is truncated.")
+    received = bits[FRAME_HEADER_BITS:FRAME_HEADER_BITS + length * CODEWORD_BITS].reshape(CODEWORD_BITS, length)
+    words = (received.astype(np.uint16) << CODEWORD_SHIFTS[:, None]).sum(axis=0, dtype=np.uint16)
+
+    data, status = decode_tables()
+    statuses = np.bincount(status[words], minlength=3)
+    stats = {
+        "codewords": length,
+        "corrected": int(statuses[STATUS_CORRECTED]),
+        "uncorrectable": int(statuses[STATUS_UNCORRECTABLE]),
+        "header_bits_outvoted": outvoted,
+    }
+    if stats["corrected"] or stats["uncorrectable"] or outvoted:
+        logger.info(f"ECC corrected {stats['corrected']} of {length} codewords and {outvoted} header bits; "
+                    f"{stats['uncorrectable']} codewords uncorrectable")
+    return data[words].tobytes(), stats
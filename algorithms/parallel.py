@@ -0,0 +1,60 @@
+"""Sharded embedding/extraction that splits the carrier into contiguous ranges handled by threads."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Shards smaller than this cost more in thread hand-off than they save
+MIN_SHARD_BYTES = 1 << 20
+
+def split_ranges(total, workers):
+    """
+    Splits ``range(total)`` into at most ``workers`` contiguous ranges of at least MIN_SHARD_BYTES.
+
+    :param total: Number of carrier bytes to split
+    :param workers: Maximum number of ranges
+    :return: List of (start, stop) tuples covering ``range(total)`` in order
+    """
+    shards = max(1, min(workers, total // MIN_SHARD_BYTES))
+    bounds = np.linspace(0, total, shards + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def parallel_embed(carrier, bits, bits_per_byte, embed, workers=1):
+    """
+    Embeds a bit stream with one thread per carrier range; NumPy releases the GIL while each range is written.
+
+    :param carrier: Writable uint8 array of carrier bytes
+    :param bits: uint8 array of bits to embed
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param embed: Function writing bits into a uint8 array of carrier bytes
+    :param workers: Number of threads
+    """
+    ranges = split_ranges(-(-len(bits) // bits_per_byte), workers)
+    if len(ranges) == 1:
+        embed(carrier, bits)
+        return
+
+    def embed_range(bounds):
+        start, stop = bounds
+        embed(carrier[start:stop], bits[start * bits_per_byte:stop * bits_per_byte])
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        list(executor.map(embed_range, ranges))
+
+def parallel_extract(carrier, count, extract, offset=0, workers=1):
+    """
+    Extracts bits from ``count`` carrier bytes with one thread per carrier range and stitches them in order.
+
+    :param carrier: uint8 array of carrier bytes
+    :param count: Number of carrier bytes to read
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param offset: Index of the first carrier byte to read
+    :param workers: Number of threads
+    :return: uint8 array of extracted bits
+    """
+    ranges = split_ranges(count, workers)
+    if len(ranges) == 1:
+        return extract(carrier, count, offset)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        parts = executor.map(lambda bounds: extract(carrier, bounds[1] - bounds[0], offset + bounds[0]), ranges)
+        return np.concatenate(list(parts))
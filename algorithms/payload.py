@@ -0,0 +1,195 @@
+"""Versioned payload container: UTF-8 text, optional compression, a varint length header and a CRC32 trailer."""
+import lzma
+import zlib
+
+# The high bit tells framed payloads apart from the legacy 32-bit big-endian bit length,
+# whose first byte stays below 0x80 for any message that fits in a WAV file
+FORMAT_VERSION = 0x82
+# Payloads written before the checksum was added; still decoded, but cannot be verified
+FORMAT_VERSION_UNCHECKED = 0x81
+
+# Big-endian CRC32 of the stored bytes, following them in FORMAT_VERSION payloads
+CHECKSUM_BYTES = 4
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+
+# Messages shorter than these sizes are not worth the compressor's own overhead
+ZLIB_MIN_BYTES = 64
+LZMA_MIN_BYTES = 16 * 1024
+
+MAX_VARINT_BYTES = 10
+MAX_HEADER_BYTES = 2 + MAX_VARINT_BYTES  # Version, codec and the longest varint
+
+def encode_varint(value):
+    """
+    Encodes a non-negative integer as an unsigned LEB128 varint.
+
+    :param value: The integer to encode
+    :return: Between 1 and 10 bytes
+    """
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def decode_varint(data, offset=0):
+    """
+    Decodes an unsigned LEB128 varint.
+
+    :param data: Bytes holding the varint
+    :param offset: Index of the first varint byte
+    :return: Tuple of (value, number of bytes consumed)
+    """
+    value = 0
+    for i in range(MAX_VARINT_BYTES):
+        if offset + i >= len(data):
+            raise ValueError("The payload header is truncated.")
+        byte = data[offset + i]
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return value, i + 1
+    raise ValueError("The payload length is not a valid varint.")
+
+def compress(data):
+    """
+    Compresses data with the codec giving the smallest result for its size.
+
+    :param data: Raw message bytes
+    :return: Tuple of (codec id, stored bytes)
+    """
+    best = (CODEC_RAW, data)
+    if len(data) >= ZLIB_MIN_BYTES:
+        candidate = zlib.compress(data, 9)
+        if len(candidate) < len(best[1]):
+            best = (CODEC_ZLIB, candidate)
+    if len(data) >= LZMA_MIN_BYTES:
+        candidate = lzma.compress(data, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2, "preset": 6}])
+        if len(candidate) < len(best[1]):
+            best = (CODEC_LZMA, candidate)
+    return best
+
+def decompress(codec, data):
+    """
+    Reverses ``compress``.
+
+    :param codec: Codec id stored in the payload header
+    :param data: Stored bytes
+    :return: Raw message bytes
+    """
+    if codec == CODEC_RAW:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_LZMA:
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2}])
+    raise ValueError(f"Unknown payload codec {codec}.")
+
+def pack_payload(data):
+    """
+    Wraps message bytes in the payload container.
+
+    :param data: Raw message bytes
+    :return: Version byte, codec byte, varint length, the (possibly compressed) bytes and their checksum
+    """
+    codec, stored = compress(data)
+    return payload_header(codec, len(stored)) + stored + checksum(stored)
+
+def checksum(stored, crc=0):
+    """
+    Computes the checksum trailer of the stored bytes.
+
+    :param stored: Stored bytes, or the next piece of them
+    :param crc: CRC32 of the preceding pieces
+    :return: The 4-byte big-endian CRC32
+    """
+    return zlib.crc32(stored, crc).to_bytes(CHECKSUM_BYTES, 'big')
+
+def verify_checksum(crc, trailer):
+    """
+    Checks a payload's checksum trailer.
+
+    :param crc: CRC32 computed over the stored bytes
+    :param trailer: The CHECKSUM_BYTES read after them
+    """
+    if crc.to_bytes(CHECKSUM_BYTES, 'big') != bytes(trailer):
+        raise ValueError("The payload checksum does not match; the file holds no message or it is damaged.")
+
+def payload_header(codec, length):
+    """
+    Builds the header preceding the stored bytes of a payload.
+
+    :param codec: Codec id of the stored bytes
+    :param length: Number of stored bytes
+    :return: Version byte, codec byte and varint length
+    """
+    return bytes([FORMAT_VERSION, codec]) + encode_varint(length)
+
+def parse_payload_header(header):
+    """
+    Parses the header at the start of a payload.
+
+    :param header: At least the first MAX_HEADER_BYTES of the payload, or the whole payload if shorter
+    :return: Tuple of (codec id, header size in bytes, number of stored bytes, checksum size in bytes)
+    """
+    if len(header) < 3:
+        raise ValueError("The payload header is truncated.")
+    if header[0] not in (FORMAT_VERSION, FORMAT_VERSION_UNCHECKED):
+        raise ValueError(f"Unsupported payload format version 0x{header[0]:02x}.")
+    if header[1] not in (CODEC_RAW, CODEC_ZLIB, CODEC_LZMA):
+        raise ValueError(f"Unknown payload codec {header[1]}.")
+    length, varint_size = decode_varint(header, 2)
+    return header[1], 2 + varint_size, length, CHECKSUM_BYTES if header[0] == FORMAT_VERSION else 0
+
+def payload_size(header):
+    """
+    Returns the total size of a payload from its first bytes.
+
+    :param header: At least the first MAX_HEADER_BYTES of the payload, or the whole payload if shorter
+    :return: Size of the header, stored bytes and checksum together
+    """
+    _, header_size, length, checksum_size = parse_payload_header(header)
+    return header_size + length + checksum_size
+
+def unpack_payload(payload):
+    """
+    Extracts the message bytes from a payload container.
+
+    :param payload: The complete payload
+    :return: Raw message bytes
+    """
+    codec, header_size, length, checksum_size = parse_payload_header(payload[:MAX_HEADER_BYTES])
+    if len(payload) < header_size + length + checksum_size:
+        raise ValueError("The payload is truncated.")
+    stored = payload[header_size:header_size + length]
+    if checksum_size:
+        verify_checksum(zlib.crc32(stored), payload[header_size + length:header_size + length + checksum_size])
+    return decompress(codec, stored)
+
+def iter_decompress(codec, chunks):
+    """
+    Decompresses stored bytes piece by piece, so large payloads never have to be held whole.
+
+    :param codec: Codec id stored in the payload header
+    :param chunks: Iterable of consecutive pieces of the stored bytes
+    :return: Generator of raw message byte pieces
+    """
+    if codec == CODEC_RAW:
+        yield from chunks
+        return
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj()
+    elif codec == CODEC_LZMA:
+        decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=[{"id": lzma.FILTER_LZMA2}])
+    else:
+        raise ValueError(f"Unknown payload codec {codec}.")
+    for chunk in chunks:
+        yield decompressor.decompress(chunk)
+    if not decompressor.eof:
+        raise ValueError("The compressed payload is truncated.")
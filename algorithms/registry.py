@@ -0,0 +1,126 @@
+"""Registry of steganography algorithms whose modules are imported only when first used."""
+import importlib
+from collections.abc import Mapping
+
+ENTRY_POINT_GROUP = "audio_steganography.algorithms"
+
+# Functions an algorithm module may provide; only encode, decode and capacity are required
+OPERATIONS = (
+    "encode",
+    "decode",
+    "capacity",
+    "encode_streaming",
+    "decode_streaming",
+    "encode_mmap",
+    "decode_mmap",
+    "encode_file",
+    "decode_file",
+    "probe",
+)
+
+class AlgorithmEntry(Mapping):
+    """
+    Read-only mapping describing one algorithm.
+
+    ``name`` and ``output_file`` are available without importing anything; looking up an
+    operation such as ``entry['encode']`` imports the algorithm module on first use. Iterating
+    imports it too, since only the operations the module defines are listed.
+    """
+
+    def __init__(self, name, module_name, output_file):
+        self._fields = {"name": name, "module": module_name, "output_file": output_file}
+        self._module = None
+
+    @property
+    def module(self):
+        """The algorithm module, imported on first access."""
+        if self._module is None:
+            self._module = importlib.import_module(self._fields["module"])
+        return self._module
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return self._fields[key]
+        if key in OPERATIONS:
+            try:
+                return getattr(self.module, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._fields
+        yield from (operation for operation in OPERATIONS if hasattr(self.module, operation))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"AlgorithmEntry({self._fields['name']!r}, {self._fields['module']!r})"
+
+class AlgorithmRegistry(Mapping):
+    """
+    Mapping of menu number to AlgorithmEntry, filled by ``register`` and entry points.
+
+    Entry points are only scanned when the registry is listed or asked for a number that is not
+    registered yet, so looking up a built-in algorithm never pays for ``importlib.metadata``.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._entry_point_groups = []
+
+    def register(self, name, module_name, output_file=None):
+        """
+        Registers an algorithm under the next free menu number without importing it.
+
+        :param name: Name shown in the algorithm menu
+        :param module_name: Dotted path of the module defining the algorithm functions
+        :param output_file: Standard output file path (defaults to ``output/<module>_encoded.wav``)
+        :return: The menu number assigned to the algorithm
+        """
+        if output_file is None:
+            output_file = f"output/{module_name.rsplit('.', 1)[-1]}_encoded.wav"
+        key = len(self._entries) + 1
+        self._entries[key] = AlgorithmEntry(name, module_name, output_file)
+        return key
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        """
+        Registers the algorithms installed packages declare in the given entry point group, once the registry is first listed.
+
+        The entry point name is the algorithm name and its value the module path, so nothing is
+        imported until the algorithm is used.
+
+        :param group: Entry point group to read
+        """
+        self._entry_point_groups.append(group)
+
+    def _load_pending_entry_points(self):
+        """Scans the entry point groups passed to ``load_entry_points`` that have not been read yet."""
+        if not self._entry_point_groups:
+            return
+        from importlib.metadata import entry_points  # Costs tens of milliseconds, so only imported when needed
+        groups, self._entry_point_groups = self._entry_point_groups, []
+        for group in groups:
+            registered_modules = {entry["module"] for entry in self._entries.values()}
+            try:
+                installed = entry_points(group=group)
+            except TypeError:  # Python 3.8 and 3.9 return a dict of all groups instead
+                installed = entry_points().get(group, [])
+            for entry_point in sorted(installed, key=lambda ep: ep.name):
+                if entry_point.value not in registered_modules:
+                    self.register(entry_point.name, entry_point.value)
+
+    def __getitem__(self, key):
+        if key not in self._entries:
+            self._load_pending_entry_points()
+        return self._entries[key]
+
+    def __iter__(self):
+        self._load_pending_entry_points()
+        return iter(self._entries)
+
+    def __len__(self):
+        self._load_pending_entry_points()
+        return len(self._entries)
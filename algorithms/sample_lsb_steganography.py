@@ -0,0 +1,254 @@
+import numpy as np
+from utils.logging_util import setup_logger
+from utils.metrics import METRICS
+from algorithms.audio_io import open_audio
+from algorithms.bit_packing import (
+    HEADER_READ_BITS,
+    message_to_bits,
+    payload_length_bits,
+    bits_to_message,
+    frames_to_array,
+    sample_lsb_view,
+    embed_lsb,
+    extract_lsb,
+)
+from algorithms.streaming import (
+    DEFAULT_BLOCK_FRAMES,
+    read_frame_bytes,
+    stream_encode,
+    stream_decode,
+    stream_encode_file,
+    stream_decode_file,
+)
+from algorithms.wav_mmap import mmap_encode, mmap_decode, mmap_probe
+
+logger = setup_logger(__name__)
+
+BITS_PER_SAMPLE = 1  # Each sample stores 1 bit in the LSB of its low-order byte
+
+def capacity(nframes, sampwidth, nchannels):
+    """
+    Returns how many message bits fit into audio with the given parameters.
+
+    :param nframes: Number of audio frames
+    :param sampwidth: Sample width in bytes
+    :param nchannels: Number of channels
+    :return: Payload capacity in bits, including the payload header
+    """
+    return nframes * nchannels * BITS_PER_SAMPLE
+
+def encode(input_file_path, output_file_path, secret_message):
+    """
+    Encodes a secret message into an audio file using sample-aware LSB steganography with a length-prefixed payload.
+    One bit is stored in the true least significant bit of every sample, whatever the sample width.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Encoding starts...")
+        watch = METRICS.stopwatch("encode")
+        audio = open_audio(input_file_path, mode="rb")
+        frame_bytes = frames_to_array(audio.readframes(audio.getnframes()))
+        samples = sample_lsb_view(frame_bytes, audio.getsampwidth())
+        watch.lap("read")
+
+        logger.info(f"Secret message: {len(secret_message)} characters")
+        # Wrap the secret message in its payload container and convert it to bits
+        full_bits = message_to_bits(secret_message)
+        watch.lap("bit_prep")
+
+        # Ensure the message fits into the samples
+        if len(full_bits) > len(samples):
+            raise ValueError("The secret message is too large to fit in the audio file.")
+
+        # Encode the full bits into the LSB of each sample
+        embed_lsb(samples, full_bits)
+        watch.lap("embed")
+
+        # Write the modified bytes to the new audio file
+        with open_audio(output_file_path, 'wb') as new_audio:
+            new_audio.setparams(audio.getparams())
+            new_audio.writeframes(frame_bytes)
+
+        audio.close()
+        watch.lap("write")
+        watch.count("carrier_bytes", len(frame_bytes))
+        watch.count("payload_bits", len(full_bits))
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode(input_file_path):
+    """
+    Decodes a secret message from an audio file using sample-aware LSB steganography with a length-prefixed payload.
+
+    :param input_file_path: Path to the encoded audio file
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Decoding starts...")
+        watch = METRICS.stopwatch("decode")
+        audio = open_audio(input_file_path, mode='rb')
+        sampwidth = audio.getsampwidth()
+        available_samples = audio.getnframes() * audio.getnchannels()
+
+        # Read and extract only the header samples to determine the payload length
+        header_count = min(HEADER_READ_BITS, available_samples)
+        header_bytes = read_frame_bytes(audio, header_count * sampwidth)
+        watch.lap("read")
+        payload_length = payload_length_bits(extract_lsb(sample_lsb_view(header_bytes, sampwidth), header_count))
+        watch.lap("extract")
+
+        logger.info(f"Extracted payload length: {payload_length} bits")
+
+        # Now read only the samples carrying the payload bits
+        if payload_length > available_samples:
+            raise ValueError("The extracted message length is larger than the available audio data.")
+
+        remaining = payload_length * sampwidth - len(header_bytes)
+        frame_bytes = np.concatenate([header_bytes, read_frame_bytes(audio, remaining)])
+        watch.lap("read")
+        payload_bits = extract_lsb(sample_lsb_view(frame_bytes, sampwidth), payload_length)
+        watch.lap("extract")
+
+        # Unpack the payload back into the message
+        decoded_message = bits_to_message(payload_bits)
+        watch.lap("unpack")
+        watch.count("carrier_bytes", len(frame_bytes))
+        watch.count("payload_bits", payload_length)
+
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        audio.close()
+        return decoded_message
+
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def encode_streaming(input_file_path, output_file_path, secret_message, block_frames=DEFAULT_BLOCK_FRAMES):
+    """
+    Encodes a secret message using sample-aware LSB steganography, reading and writing the audio in fixed-size blocks.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :param block_frames: Number of frames processed per block
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Streaming encoding starts...")
+        stream_encode(input_file_path, output_file_path, message_to_bits(secret_message), BITS_PER_SAMPLE, embed_lsb, block_frames, per_sample=True)
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode_streaming(input_file_path, block_frames=DEFAULT_BLOCK_FRAMES):
+    """
+    Decodes a secret message using sample-aware LSB steganography, reading only the blocks that carry the message.
+
+    :param input_file_path: Path to the encoded audio file
+    :param block_frames: Number of frames read per block
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Streaming decoding starts...")
+        decoded_message = stream_decode(input_file_path, BITS_PER_SAMPLE, extract_lsb, block_frames, per_sample=True)
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        return decoded_message
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def encode_file(input_file_path, output_file_path, payload, block_frames=DEFAULT_BLOCK_FRAMES):
+    """
+    Encodes a binary file using sample-aware LSB steganography, streaming it into the carrier in chunks.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param payload: Path or readable binary file object holding the payload
+    :param block_frames: Number of frames processed per block
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("File payload encoding starts...")
+        size = stream_encode_file(input_file_path, output_file_path, payload, BITS_PER_SAMPLE, embed_lsb, block_frames, per_sample=True)
+        logger.info(f"Successfully encoded {size} payload bytes into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode_file(input_file_path, output, block_frames=DEFAULT_BLOCK_FRAMES):
+    """
+    Decodes a payload using sample-aware LSB steganography, writing its bytes to a file as they are extracted.
+
+    :param input_file_path: Path to the encoded audio file
+    :param output: Path or writable binary file object receiving the payload
+    :param block_frames: Number of frames read per block
+    :return: Number of payload bytes written, or None if decoding failed
+    """
+    try:
+        logger.info("File payload decoding starts...")
+        size = stream_decode_file(input_file_path, output, BITS_PER_SAMPLE, extract_lsb, block_frames, per_sample=True)
+        logger.info(f"Successfully decoded {size} payload bytes")
+        return size
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def encode_mmap(input_file_path, output_file_path, secret_message, workers=1):
+    """
+    Encodes a secret message using sample-aware LSB steganography, patching only the payload samples of the output through mmap.
+    Passing the same path for input and output embeds the message in place.
+
+    :param input_file_path: Path to the input WAV file
+    :param output_file_path: Path to the output encoded WAV file
+    :param secret_message: The message to be encoded
+    :param workers: Number of threads embedding contiguous carrier ranges in parallel
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Memory-mapped encoding starts...")
+        mmap_encode(input_file_path, output_file_path, message_to_bits(secret_message), BITS_PER_SAMPLE, embed_lsb, per_sample=True, workers=workers)
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode_mmap(input_file_path, workers=1):
+    """
+    Decodes a secret message using sample-aware LSB steganography, reading only the mapped samples that carry it.
+
+    :param input_file_path: Path to the encoded WAV file
+    :param workers: Number of threads extracting contiguous carrier ranges in parallel
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Memory-mapped decoding starts...")
+        decoded_message = mmap_decode(input_file_path, BITS_PER_SAMPLE, extract_lsb, per_sample=True, workers=workers)
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        return decoded_message
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def probe(input_file_path):
+    """
+    Checks whether an audio file plausibly holds a message embedded with sample-aware LSB steganography, reading only the payload header.
+
+    :param input_file_path: Path to the WAV file
+    :return: Tuple of (payload length in bits, whether the payload carries a checksum), or None if there is no plausible payload
+    """
+    try:
+        return mmap_probe(input_file_path, BITS_PER_SAMPLE, extract_lsb, per_sample=True)
+    except Exception as e:
+        logger.debug(f"No payload in {input_file_path}: {e}")
+        return None
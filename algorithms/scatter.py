@@ -0,0 +1,117 @@
+"""Keyed pseudo-random permutation of carrier positions, evaluated only at the indices that are needed."""
+import hashlib
+
+import numpy as np
+
+FEISTEL_ROUNDS = 6
+
+# Positions generated at a time, so temporaries stay small for large payloads
+SCATTER_CHUNK_BITS = 1 << 20
+
+# SplitMix64 finalizer constants used as the Feistel round function
+MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+def mix(values):
+    """
+    Scrambles 64-bit values with the SplitMix64 finalizer.
+
+    :param values: uint64 array, modified in place
+    :return: The scrambled array
+    """
+    values *= MIX_MULTIPLIER_1
+    values ^= values >> np.uint64(31)
+    values *= MIX_MULTIPLIER_2
+    values ^= values >> np.uint64(29)
+    return values
+
+class KeyedPermutation:
+    """
+    Keyed permutation of ``range(size)`` that maps any slice of payload bit indices to carrier
+    positions without building the whole permutation.
+
+    A balanced Feistel network permutes the smallest even power of two covering ``size``, and
+    cycle walking folds values outside ``range(size)`` back in, so the mapping stays a bijection.
+    Round keys come from a NumPy Generator seeded with a BLAKE2 hash of the key.
+    """
+
+    def __init__(self, key, size, rounds=FEISTEL_ROUNDS):
+        if size < 1:
+            raise ValueError("The carrier has no positions to scatter the payload over.")
+        self.size = size
+        half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_bits = np.uint64(half_bits)
+        self._half_mask = np.uint64((1 << half_bits) - 1)
+        seed = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest(), 'big')
+        self._round_keys = np.frombuffer(np.random.default_rng(seed).bytes(8 * rounds), dtype=np.uint64)
+
+    def _forward(self, values):
+        left = values >> self._half_bits
+        right = values & self._half_mask
+        for round_key in self._round_keys:
+            left, right = right, left ^ (mix(right ^ round_key) & self._half_mask)
+        return (left << self._half_bits) | right
+
+    def _inverse(self, values):
+        left = values >> self._half_bits
+        right = values & self._half_mask
+        for round_key in self._round_keys[::-1]:
+            left, right = right ^ (mix(left ^ round_key) & self._half_mask), left
+        return (left << self._half_bits) | right
+
+    def _walk(self, start, stop, step):
+        # Clipped like a slice; cycle walking from an index outside the range would never return to it
+        values = step(np.arange(start, min(stop, self.size), dtype=np.uint64))
+        outside = values >= self.size
+        while outside.any():
+            values[outside] = step(values[outside])
+            outside = values >= self.size
+        return values.astype(np.intp)
+
+    def positions(self, start, stop):
+        """
+        Returns the carrier positions of payload bits ``start`` to ``stop``.
+
+        :param start: Index of the first payload bit
+        :param stop: Index after the last payload bit
+        :return: intp array of carrier positions
+        """
+        return self._walk(start, stop, self._forward)
+
+    def indices(self, start, stop):
+        """
+        Returns the payload bit index stored at carrier positions ``start`` to ``stop``.
+
+        :param start: First carrier position
+        :param stop: Position after the last carrier position
+        :return: intp array of payload bit indices (values >= the payload length carry no payload)
+        """
+        return self._walk(start, stop, self._inverse)
+
+def embed_scattered(carrier, bits, permutation, offset=0):
+    """
+    Writes one bit into the least significant bit of each permuted carrier position.
+
+    :param carrier: Writable uint8 array or view of carrier bytes
+    :param bits: uint8 array of bits to embed
+    :param permutation: KeyedPermutation over ``len(carrier)``
+    :param offset: Payload index of the first bit
+    """
+    for start in range(0, len(bits), SCATTER_CHUNK_BITS):
+        chunk = bits[start:start + SCATTER_CHUNK_BITS]
+        positions = permutation.positions(offset + start, offset + start + len(chunk))
+        carrier[positions] = (carrier[positions] & 254) | chunk
+
+def extract_scattered(carrier, permutation, start, stop):
+    """
+    Reads the bits of payload indices ``start`` to ``stop`` from their permuted carrier positions.
+
+    :param carrier: uint8 array or view of carrier bytes
+    :param permutation: KeyedPermutation over ``len(carrier)``
+    :param start: Index of the first payload bit
+    :param stop: Index after the last payload bit
+    :return: uint8 array of extracted bits
+    """
+    chunks = [carrier[permutation.positions(chunk_start, min(chunk_start + SCATTER_CHUNK_BITS, stop))] & 1
+              for chunk_start in range(start, stop, SCATTER_CHUNK_BITS)]
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint8)
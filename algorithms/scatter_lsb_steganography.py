@@ -0,0 +1,369 @@
+import os
+import numpy as np
+from utils.logging_util import setup_logger
+from utils.metrics import METRICS
+from algorithms.audio_io import open_audio
+from algorithms.bit_packing import (
+    HEADER_READ_BITS,
+    message_to_bits,
+    payload_length_bits,
+    bits_to_message,
+    frames_to_array,
+    sample_lsb_view,
+)
+from algorithms.scatter import SCATTER_CHUNK_BITS, KeyedPermutation, embed_scattered, extract_scattered
+from algorithms.streaming import DEFAULT_BLOCK_FRAMES, staged_output
+from algorithms.wav_mmap import mmap_encode, mmap_decode, mmap_probe
+
+logger = setup_logger(__name__)
+
+BITS_PER_SAMPLE = 1  # Each sample stores 1 bit in the LSB of its low-order byte
+
+# Environment variable holding the key that selects the carrier positions
+KEY_ENV_VAR = "STEGANOGRAPHY_KEY"
+DEFAULT_KEY = "audio-steganography"
+
+def resolve_key(key):
+    """
+    Returns the key to use: the given one, else the STEGANOGRAPHY_KEY environment variable, else the public default.
+
+    :param key: Key passed by the caller, or None
+    :return: The key string
+    """
+    if key is None:
+        key = os.environ.get(KEY_ENV_VAR)
+    if key is None:
+        logger.warning(f"{KEY_ENV_VAR} is not set; scattering with the public default key.")
+        key = DEFAULT_KEY
+    return key
+
+def capacity(nframes, sampwidth, nchannels):
+    """
+    Returns how many message bits fit into audio with the given parameters.
+
+    :param nframes: Number of audio frames
+    :param sampwidth: Sample width in bytes
+    :param nchannels: Number of channels
+    :return: Payload capacity in bits, including the payload header
+    """
+    return nframes * nchannels * BITS_PER_SAMPLE
+
+def scattered_embedder(key):
+    """Returns an ``embed(carrier, bits)`` function that scatters bits over the whole carrier."""
+    def embed(carrier, bits):
+        embed_scattered(carrier, bits, KeyedPermutation(key, len(carrier)))
+    return embed
+
+def scattered_extractor(key):
+    """Returns an ``extract(carrier, count, offset)`` function reading payload bits from their scattered positions."""
+    def extract(carrier, count, offset=0):
+        return extract_scattered(carrier, KeyedPermutation(key, len(carrier)), offset, offset + count)
+    return extract
+
+def encode(input_file_path, output_file_path, secret_message, key=None):
+    """
+    Encodes a secret message into an audio file using keyed scatter LSB steganography.
+    Each payload bit is stored in the LSB of a sample chosen by a keyed pseudo-random permutation.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :param key: Key selecting the sample positions (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Encoding starts...")
+        watch = METRICS.stopwatch("encode")
+        audio = open_audio(input_file_path, mode="rb")
+        frame_bytes = frames_to_array(audio.readframes(audio.getnframes()))
+        samples = sample_lsb_view(frame_bytes, audio.getsampwidth())
+        watch.lap("read")
+
+        logger.info(f"Secret message: {len(secret_message)} characters")
+        # Wrap the secret message in its payload container and convert it to bits
+        full_bits = message_to_bits(secret_message)
+        watch.lap("bit_prep")
+
+        # Ensure the message fits into the samples
+        if len(full_bits) > len(samples):
+            raise ValueError("The secret message is too large to fit in the audio file.")
+
+        # Scatter the bits over the samples; only the positions of the payload bits are generated
+        embed_scattered(samples, full_bits, KeyedPermutation(resolve_key(key), len(samples)))
+        watch.lap("embed")
+
+        # Write the modified bytes to the new audio file
+        with open_audio(output_file_path, 'wb') as new_audio:
+            new_audio.setparams(audio.getparams())
+            new_audio.writeframes(frame_bytes)
+
+        audio.close()
+        watch.lap("write")
+        watch.count("carrier_bytes", len(frame_bytes))
+        watch.count("payload_bits", len(full_bits))
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode(input_file_path, key=None):
+    """
+    Decodes a secret message from an audio file using keyed scatter LSB steganography.
+
+    :param input_file_path: Path to the encoded audio file
+    :param key: Key the message was encoded with (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Decoding starts...")
+        watch = METRICS.stopwatch("decode")
+        audio = open_audio(input_file_path, mode='rb')
+        # The payload is spread over the whole file, so all frames are needed
+        frame_bytes = np.frombuffer(audio.readframes(audio.getnframes()), dtype=np.uint8)
+        samples = sample_lsb_view(frame_bytes, audio.getsampwidth())
+        watch.lap("read")
+
+        # Extract only the header bits to determine the payload length
+        permutation = KeyedPermutation(resolve_key(key), len(samples))
+        header = extract_scattered(samples, permutation, 0, min(HEADER_READ_BITS, len(samples)))
+        payload_length = payload_length_bits(header)
+
+        logger.info(f"Extracted payload length: {payload_length} bits")
+
+        if payload_length > len(samples):
+            raise ValueError("The extracted message length is larger than the available audio data.")
+
+        # Generate positions only for the payload bits not covered by the header read
+        payload_bits = np.concatenate([header, extract_scattered(samples, permutation, len(header), payload_length)])[:payload_length]
+        watch.lap("extract")
+
+        # Unpack the payload back into the message
+        decoded_message = bits_to_message(payload_bits)
+        watch.lap("unpack")
+        watch.count("carrier_bytes", len(frame_bytes))
+        watch.count("payload_bits", payload_length)
+
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        audio.close()
+        return decoded_message
+
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def encode_streaming(input_file_path, output_file_path, secret_message, block_frames=DEFAULT_BLOCK_FRAMES, key=None):
+    """
+    Encodes a secret message using keyed scatter LSB steganography, reading and writing the audio in fixed-size blocks.
+    Each block inverts the permutation for its own samples, so no position list is held for the whole file.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :param block_frames: Number of frames processed per block
+    :param key: Key selecting the sample positions (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Streaming encoding starts...")
+        full_bits = message_to_bits(secret_message)
+        with open_audio(input_file_path, mode='rb') as audio:
+            sampwidth = audio.getsampwidth()
+            if audio.getnframes() is None:
+                raise ValueError("Scattering needs the length of the audio up front, which a stream does not provide.")
+            total_samples = audio.getnframes() * audio.getnchannels()
+            if len(full_bits) > total_samples:
+                raise ValueError("The secret message is too large to fit in the audio file.")
+            permutation = KeyedPermutation(resolve_key(key), total_samples)
+
+            with staged_output(output_file_path) as output, open_audio(output, 'wb') as new_audio:
+                new_audio.setparams(audio.getparams())
+                position = 0
+                while True:
+                    frames = audio.readframes(block_frames)
+                    if not frames:
+                        break
+                    frame_bytes = frames_to_array(frames)
+                    samples = sample_lsb_view(frame_bytes, sampwidth)
+                    indices = permutation.indices(position, position + len(samples))
+                    carrying = indices < len(full_bits)
+                    samples[carrying] = (samples[carrying] & 254) | full_bits[indices[carrying]]
+                    position += len(samples)
+                    new_audio.writeframesraw(frame_bytes)
+
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def read_sample_lsbs(audio, positions):
+    """
+    Reads the low-order byte of individual samples by seeking to their frames.
+
+    :param audio: An open frame source (see ``algorithms.audio_io``)
+    :param positions: Sample positions across all channels
+    :return: uint8 array with one byte per position
+    """
+    sampwidth, nchannels = audio.getsampwidth(), audio.getnchannels()
+    values = np.empty(len(positions), dtype=np.uint8)
+    for i, position in enumerate(positions):
+        audio.setpos(int(position) // nchannels)
+        values[i] = audio.readframes(1)[(int(position) % nchannels) * sampwidth]
+    return values
+
+def buffer_header_lsbs(audio, permutation, header_count, block_frames):
+    """
+    Reads a stream that cannot be repositioned up to the last sample carrying a header bit, keeping one LSB per sample.
+
+    :param audio: An open frame source (see ``algorithms.audio_io``)
+    :param permutation: KeyedPermutation over all samples
+    :param header_count: Number of header bits to collect
+    :param block_frames: Number of frames read per block, a multiple of 8
+    :return: Tuple of (header bits, packed LSBs of every sample read, number of samples read)
+    """
+    sampwidth = audio.getsampwidth()
+    header_positions = permutation.positions(0, header_count)
+    header_end = int(header_positions.max()) + 1
+    pieces = []
+    position = 0
+    while position < header_end:
+        frames = audio.readframes(block_frames)
+        if not frames:
+            raise ValueError("The audio data ended before the payload header was read.")
+        lsbs = sample_lsb_view(np.frombuffer(frames, dtype=np.uint8), sampwidth) & 1
+        pieces.append(np.packbits(lsbs))  # Whole blocks hold a multiple of 8 samples, so the pieces stay aligned
+        position += len(lsbs)
+    packed = np.concatenate(pieces)
+    header = (packed[header_positions >> 3] >> (7 - (header_positions & 7))) & 1
+    return header.astype(np.uint8), packed, position
+
+def extract_buffered(packed, count, permutation, payload_bits):
+    """
+    Collects the payload bits held by buffered samples.
+
+    :param packed: Packed LSBs of the first ``count`` samples
+    :param count: Number of buffered samples
+    :param permutation: KeyedPermutation over all samples
+    :param payload_bits: uint8 array receiving the payload bits, modified in place
+    :return: Number of payload bits found
+    """
+    found = 0
+    for start in range(0, count, SCATTER_CHUNK_BITS):
+        stop = min(start + SCATTER_CHUNK_BITS, count)
+        indices = permutation.indices(start, stop)
+        carrying = indices < len(payload_bits)
+        payload_bits[indices[carrying]] = np.unpackbits(packed[start // 8:-(-stop // 8)], count=stop - start)[carrying]
+        found += np.count_nonzero(carrying)
+    return found
+
+def decode_streaming(input_file_path, block_frames=DEFAULT_BLOCK_FRAMES, key=None):
+    """
+    Decodes a secret message using keyed scatter LSB steganography, reading the audio in fixed-size blocks.
+    The header samples are read by seeking; the payload is then collected in one pass that stops once every bit is found.
+    Streams that cannot seek, such as standard input, are read once instead: the LSBs up to the last header
+    sample are kept (one bit per sample) and searched for payload bits once the header gives the length.
+
+    :param input_file_path: Path to the encoded audio file
+    :param block_frames: Number of frames read per block
+    :param key: Key the message was encoded with (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Streaming decoding starts...")
+        with open_audio(input_file_path, mode='rb') as audio:
+            sampwidth = audio.getsampwidth()
+            if audio.getnframes() is None:
+                raise ValueError("Scattering needs the length of the audio up front, which a stream does not provide.")
+            total_samples = audio.getnframes() * audio.getnchannels()
+            permutation = KeyedPermutation(resolve_key(key), total_samples)
+            header_count = min(HEADER_READ_BITS, total_samples)
+
+            if audio.seekable():
+                header = read_sample_lsbs(audio, permutation.positions(0, header_count)) & 1
+                audio.rewind()
+                packed, position = None, 0
+            else:
+                block_frames = -(-block_frames // 8) * 8
+                header, packed, position = buffer_header_lsbs(audio, permutation, header_count, block_frames)
+            payload_length = payload_length_bits(header)
+            if payload_length > total_samples:
+                raise ValueError("The extracted message length is larger than the available audio data.")
+
+            payload_bits = np.zeros(payload_length, dtype=np.uint8)
+            found = 0
+            if packed is not None:
+                found = extract_buffered(packed, position, permutation, payload_bits)
+                del packed
+            while found < payload_length:
+                frames = audio.readframes(block_frames)
+                if not frames:
+                    raise ValueError("The audio data ended before the full message was read.")
+                samples = sample_lsb_view(np.frombuffer(frames, dtype=np.uint8), sampwidth)
+                indices = permutation.indices(position, position + len(samples))
+                carrying = indices < payload_length
+                payload_bits[indices[carrying]] = samples[carrying] & 1
+                found += np.count_nonzero(carrying)
+                position += len(samples)
+
+        decoded_message = bits_to_message(payload_bits)
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        return decoded_message
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def encode_mmap(input_file_path, output_file_path, secret_message, workers=1, key=None):
+    """
+    Encodes a secret message using keyed scatter LSB steganography, patching only the payload samples of the output through mmap.
+    Passing the same path for input and output embeds the message in place.
+
+    :param input_file_path: Path to the input WAV file
+    :param output_file_path: Path to the output encoded WAV file
+    :param secret_message: The message to be encoded
+    :param workers: Accepted like the other algorithms' ``encode_mmap``; the embedding always runs on one thread
+    :param key: Key selecting the sample positions (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The output file path, or None if encoding failed
+    """
+    try:
+        logger.info("Memory-mapped encoding starts...")
+        # The scattered positions span the whole carrier, so it is not split across threads
+        mmap_encode(input_file_path, output_file_path, message_to_bits(secret_message), BITS_PER_SAMPLE,
+                    scattered_embedder(resolve_key(key)), per_sample=True)
+        logger.info(f"Successfully encoded into {output_file_path}")
+        return output_file_path
+    except Exception as e:
+        logger.error(f"Error during encoding: {e}")
+        return None
+
+def decode_mmap(input_file_path, workers=1, key=None):
+    """
+    Decodes a secret message using keyed scatter LSB steganography, reading only the mapped samples that carry it.
+
+    :param input_file_path: Path to the encoded WAV file
+    :param workers: Number of threads extracting contiguous ranges of payload bits in parallel
+    :param key: Key the message was encoded with (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: The decoded secret message
+    """
+    try:
+        logger.info("Memory-mapped decoding starts...")
+        decoded_message = mmap_decode(input_file_path, BITS_PER_SAMPLE, scattered_extractor(resolve_key(key)), per_sample=True, workers=workers)
+        logger.info(f"Successfully decoded {len(decoded_message)} characters")
+        return decoded_message
+    except Exception as e:
+        logger.error(f"Error during decoding: {e}")
+        return None
+
+def probe(input_file_path, key=None):
+    """
+    Checks whether an audio file plausibly holds a message embedded with keyed scatter LSB steganography, reading only the payload header.
+
+    :param input_file_path: Path to the WAV file
+    :param key: Key the message was encoded with (defaults to the STEGANOGRAPHY_KEY environment variable)
+    :return: Tuple of (payload length in bits, whether the payload carries a checksum), or None if there is no plausible payload
+    """
+    try:
+        return mmap_probe(input_file_path, BITS_PER_SAMPLE, scattered_extractor(resolve_key(key)), per_sample=True)
+    except Exception as e:
+        logger.debug(f"No payload in {input_file_path}: {e}")
+        return None
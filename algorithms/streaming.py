@@ -0,0 +1,289 @@
+"""Block-wise encode/decode helpers that keep peak memory bounded regardless of audio size."""
+import math
+import os
+import secrets
+import shutil
+import tempfile
+import zlib
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+
+from utils.metrics import METRICS
+from algorithms.audio_io import open_audio
+from algorithms.bit_packing import (
+    HEADER_READ_BITS,
+    PAYLOAD_CHUNK_BYTES,
+    BitStream,
+    file_payload_bit_length,
+    file_payload_bits,
+    payload_layout,
+    payload_length_bits,
+    bits_to_message,
+    frames_to_array,
+    carrier_bytes,
+)
+from algorithms.payload import iter_decompress, verify_checksum
+
+DEFAULT_BLOCK_FRAMES = 65536
+
+def read_frame_bytes(audio, byte_count):
+    """
+    Reads the whole frames covering the next ``byte_count`` bytes of a frame source.
+
+    :param audio: An open frame source (see ``algorithms.audio_io``)
+    :param byte_count: Number of bytes needed from the current position
+    :return: Read-only uint8 array of at least ``byte_count`` bytes, unless the audio ends first
+    """
+    if byte_count <= 0:
+        return np.empty(0, dtype=np.uint8)
+    frame_size = audio.getsampwidth() * audio.getnchannels()
+    return np.frombuffer(audio.readframes(-(-byte_count // frame_size)), dtype=np.uint8)
+
+def carrier_capacity(audio, bits_per_byte, per_sample=False):
+    """
+    Returns how many payload bits the audio of a frame source can carry.
+
+    :param audio: An open frame source (see ``algorithms.audio_io``)
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param per_sample: Count only the least significant byte of each sample
+    :return: Capacity in bits, or infinity for a stream whose length is not known up front
+    """
+    if audio.getnframes() is None:
+        return math.inf
+    samples = audio.getnframes() * audio.getnchannels()
+    return (samples if per_sample else samples * audio.getsampwidth()) * bits_per_byte
+
+@contextmanager
+def staged_output(output):
+    """
+    Writes an output file under a temporary name in its directory and moves it into place once writing succeeded.
+
+    The carrier is still being read while the output is written, so opening the output directly
+    would truncate a carrier encoded in place. A failed write leaves the destination untouched
+    instead of partial.
+
+    :param output: Destination path, or a writable binary file object, which is used as it is
+    :return: Context manager yielding the path or file object to write to
+    """
+    if hasattr(output, 'write'):
+        yield output
+        return
+    directory, name = os.path.split(os.path.abspath(output))
+    stem, extension = os.path.splitext(name)
+    while True:
+        # The extension is kept because it picks the output container; the mode leaves the umask in effect
+        staging = os.path.join(directory, f".{stem}.{secrets.token_hex(4)}{extension}")
+        try:
+            os.close(os.open(staging, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            break
+        except FileExistsError:
+            continue
+    try:
+        yield staging
+        os.replace(staging, output)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+def stream_encode(input_file_path, output_file_path, full_bits, bits_per_byte, embed, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False):
+    """
+    Embeds a bit stream into an audio file block by block, copying untouched blocks straight through.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param full_bits: uint8 array of header and message bits
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param embed: Function writing bits into a uint8 array of carrier bytes
+    :param block_frames: Number of frames read and written per block
+    :param per_sample: Embed only into the least significant byte of each sample
+    """
+    stream_encode_bits(input_file_path, output_file_path, BitStream([full_bits]), len(full_bits), bits_per_byte, embed, block_frames, per_sample)
+
+def stream_encode_bits(input_file_path, output_file_path, bits, total_bits, bits_per_byte, embed, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False, operation="encode_streaming"):
+    """
+    Embeds bits pulled from a BitStream block by block, so the payload never has to be expanded whole.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param bits: BitStream yielding the header and payload bits
+    :param total_bits: Number of bits the stream yields
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param embed: Function writing bits into a uint8 array of carrier bytes
+    :param block_frames: Number of frames read and written per block
+    :param per_sample: Embed only into the least significant byte of each sample
+    :param operation: Name the phase timings and counters are recorded under
+    """
+    METRICS.add(operation, "calls")
+    with open_audio(input_file_path, mode='rb') as audio:
+        sampwidth = audio.getsampwidth()
+        # Checked before the output is created, so a message that does not fit leaves no output behind
+        if total_bits > carrier_capacity(audio, bits_per_byte, per_sample):
+            raise ValueError("The secret message is too large to fit in the audio file.")
+
+        with staged_output(output_file_path) as output, open_audio(output, 'wb') as new_audio:
+            new_audio.setparams(audio.getparams())
+            position = 0
+            while True:
+                with METRICS.timer(operation, "read"):
+                    frames = audio.readframes(block_frames)
+                if not frames:
+                    break
+                METRICS.add(operation, "carrier_bytes", len(frames))
+                if position < total_bits:
+                    frame_bytes = frames_to_array(frames)
+                    carrier = carrier_bytes(frame_bytes, sampwidth, per_sample)
+                    with METRICS.timer(operation, "bit_prep"):
+                        chunk = bits.read(min(len(carrier) * bits_per_byte, total_bits - position))
+                    with METRICS.timer(operation, "embed"):
+                        embed(carrier, chunk)
+                    position += len(chunk)
+                    frames = frame_bytes
+                # The header is patched once on close instead of after every block
+                with METRICS.timer(operation, "write"):
+                    new_audio.writeframesraw(frames)
+            if position < total_bits:  # Only possible for streams of unknown length
+                raise ValueError("The secret message is too large to fit in the audio file.")
+        METRICS.add(operation, "payload_bits", position)
+
+def iter_block_bits(audio, bits_per_byte, extract, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False, operation="decode_streaming"):
+    """
+    Extracts the bits carried by each block of a frame source in turn.
+
+    :param audio: An open frame source (see ``algorithms.audio_io``)
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param block_frames: Number of frames read per block
+    :param per_sample: Read only the least significant byte of each sample
+    :param operation: Name the phase timings and counters are recorded under
+    :return: Generator of uint8 bit arrays, one per block
+    """
+    sampwidth = audio.getsampwidth()
+    while True:
+        with METRICS.timer(operation, "read"):
+            frames = audio.readframes(block_frames)
+        if not frames:
+            return
+        METRICS.add(operation, "carrier_bytes", len(frames))
+        with METRICS.timer(operation, "extract"):
+            carrier = carrier_bytes(np.frombuffer(frames, dtype=np.uint8), sampwidth, per_sample)
+            bits = extract(carrier, len(carrier))
+        yield bits
+
+def stream_decode(input_file_path, bits_per_byte, extract, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False):
+    """
+    Extracts a length-prefixed payload block by block, stopping as soon as the payload is complete.
+
+    :param input_file_path: Path to the encoded audio file
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param block_frames: Number of frames read per block
+    :param per_sample: Read only the least significant byte of each sample
+    :return: The decoded secret message
+    """
+    METRICS.add("decode_streaming", "calls")
+    with open_audio(input_file_path, mode='rb') as audio:
+        capacity = carrier_capacity(audio, bits_per_byte, per_sample)
+        bits = BitStream(iter_block_bits(audio, bits_per_byte, extract, block_frames, per_sample))
+        header = bits.read(min(HEADER_READ_BITS, capacity))
+        payload_length = payload_length_bits(header)
+        if payload_length > capacity:
+            raise ValueError("The extracted message length is larger than the available audio data.")
+        bits.unread(header)
+        payload_bits = bits.read(payload_length)
+
+    if len(payload_bits) < payload_length:
+        raise ValueError("The audio data ended before the full message was read.")
+    METRICS.add("decode_streaming", "payload_bits", payload_length)
+    with METRICS.timer("decode_streaming", "unpack"):
+        return bits_to_message(payload_bits)
+
+@contextmanager
+def open_payload_source(payload):
+    """
+    Opens a payload file and measures how many bytes it holds.
+
+    Unseekable sources such as pipes are spooled to a temporary file first, because the
+    payload length has to be written before the payload itself.
+
+    :param payload: Path or readable binary file object
+    :return: Context manager yielding (binary file object, number of bytes left in it)
+    """
+    with ExitStack() as stack:
+        source = payload if hasattr(payload, 'read') else stack.enter_context(open(payload, 'rb'))
+        if not source.seekable():
+            spool = stack.enter_context(tempfile.TemporaryFile())
+            shutil.copyfileobj(source, spool)
+            spool.seek(0)
+            source = spool
+        start = source.tell()
+        size = source.seek(0, os.SEEK_END) - start
+        source.seek(start)
+        yield source, size
+
+def stream_encode_file(input_file_path, output_file_path, payload, bits_per_byte, embed, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False):
+    """
+    Embeds a binary file block by block, reading it in chunks straight into the carrier bit positions.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param payload: Path or readable binary file object holding the payload
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param embed: Function writing bits into a uint8 array of carrier bytes
+    :param block_frames: Number of frames read and written per block
+    :param per_sample: Embed only into the least significant byte of each sample
+    :return: Number of payload bytes embedded
+    """
+    with open_payload_source(payload) as (source, size):
+        bits = BitStream(file_payload_bits(source, size))
+        stream_encode_bits(input_file_path, output_file_path, bits, file_payload_bit_length(size), bits_per_byte, embed, block_frames, per_sample,
+                           operation="encode_file")
+    return size
+
+def stream_decode_file(input_file_path, output, bits_per_byte, extract, block_frames=DEFAULT_BLOCK_FRAMES, per_sample=False):
+    """
+    Extracts a payload block by block and writes its bytes to a file as they are recovered.
+
+    :param input_file_path: Path to the encoded audio file
+    :param output: Path or writable binary file object receiving the payload
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param block_frames: Number of frames read per block
+    :param per_sample: Read only the least significant byte of each sample
+    :return: Number of payload bytes written
+    """
+    METRICS.add("decode_file", "calls")
+    with open_audio(input_file_path, mode='rb') as audio, ExitStack() as stack:
+        capacity = carrier_capacity(audio, bits_per_byte, per_sample)
+        bits = BitStream(iter_block_bits(audio, bits_per_byte, extract, block_frames, per_sample, operation="decode_file"))
+        header = bits.read(min(HEADER_READ_BITS, capacity))
+        codec, header_length, data_length, checksum_length = payload_layout(header)
+        if header_length + data_length + checksum_length > capacity:
+            raise ValueError("The extracted message length is larger than the available audio data.")
+        bits.unread(header[header_length:])
+
+        def stored_chunks():
+            remaining = data_length
+            crc = 0
+            while remaining:
+                chunk = bits.read(min(remaining, PAYLOAD_CHUNK_BYTES * 8))
+                if not len(chunk):
+                    raise ValueError("The audio data ended before the full message was read.")
+                remaining -= len(chunk)
+                data = np.packbits(chunk).tobytes()
+                crc = zlib.crc32(data, crc)
+                yield data
+            if checksum_length:
+                verify_checksum(crc, np.packbits(bits.read(checksum_length)).tobytes())
+
+        # A path only receives the payload once its checksum has been verified
+        sink = stack.enter_context(staged_output(output))
+        if not hasattr(sink, 'write'):
+            sink = stack.enter_context(open(sink, 'wb'))
+        written = 0
+        for data in iter_decompress(codec, stored_chunks()):
+            with METRICS.timer("decode_file", "write"):
+                sink.write(data)
+            written += len(data)
+        METRICS.add("decode_file", "payload_bits", header_length + data_length + checksum_length)
+        return written
@@ -0,0 +1,188 @@
+"""Memory-mapped encode/decode helpers that only touch the pages of the data chunk carrying the payload."""
+import mmap
+import os
+import shutil
+import struct
+import traceback
+
+import numpy as np
+
+from utils.metrics import METRICS
+from algorithms.audio_io import UNKNOWN_SIZE, open_audio
+from algorithms.bit_packing import HEADER_READ_BITS, payload_length_bits, payload_checked, bits_to_message, carrier_bytes
+from algorithms.parallel import parallel_embed, parallel_extract
+
+def find_chunk(buffer, chunk_id):
+    """
+    Locates a chunk of a RIFF/WAVE or RF64 file.
+
+    :param buffer: Bytes-like object (e.g. an mmap) holding the whole file
+    :param chunk_id: Four-byte chunk identifier, e.g. ``b'data'``
+    :return: Tuple of (offset of the chunk contents, size of the chunk contents in bytes)
+    """
+    if buffer[0:4] not in (b'RIFF', b'RF64') or buffer[8:12] != b'WAVE':
+        raise ValueError("The file is not a RIFF/WAVE or RF64 file.")
+
+    position = 12
+    while position + 8 <= len(buffer):
+        chunk_size = struct.unpack('<I', buffer[position + 4:position + 8])[0]
+        if buffer[0:4] == b'RF64' and buffer[position:position + 4] == b'data' and chunk_size == UNKNOWN_SIZE:
+            chunk_size = struct.unpack('<Q', buffer[28:36])[0]  # 64-bit data size from the ds64 chunk
+        if buffer[position:position + 4] == chunk_id:
+            offset = position + 8
+            return offset, min(chunk_size, len(buffer) - offset)
+        position += 8 + chunk_size + (chunk_size & 1)  # Chunks are padded to an even size
+
+    raise ValueError(f"The file has no {chunk_id.decode('ascii').strip()} chunk.")
+
+def is_mappable(input_file_path):
+    """
+    Checks whether a file is a RIFF/WAVE or RF64 file, whose samples the memory-mapped helpers can use in place.
+
+    :param input_file_path: Path to the audio file
+    :return: True for RIFF/WAVE and RF64 files
+    """
+    with open(input_file_path, 'rb') as f:
+        magic = f.read(12)
+    return magic[0:4] in (b'RIFF', b'RF64') and magic[8:12] == b'WAVE'
+
+def find_data_chunk(buffer):
+    """
+    Locates the ``data`` chunk of a RIFF/WAVE or RF64 file.
+
+    :param buffer: Bytes-like object (e.g. an mmap) holding the whole file
+    :return: Tuple of (offset of the first sample byte, size of the data chunk in bytes)
+    """
+    return find_chunk(buffer, b'data')
+
+def read_sample_width(buffer):
+    """
+    Reads the sample width from the ``fmt `` chunk of a RIFF/WAVE file.
+
+    :param buffer: Bytes-like object (e.g. an mmap) holding the whole file
+    :return: Sample width in bytes
+    """
+    fmt_offset, _ = find_chunk(buffer, b'fmt ')
+    bits_per_sample = struct.unpack('<H', buffer[fmt_offset + 14:fmt_offset + 16])[0]
+    return (bits_per_sample + 7) // 8
+
+def mmap_encode(input_file_path, output_file_path, full_bits, bits_per_byte, embed, per_sample=False, workers=1):
+    """
+    Embeds a bit stream by patching the output file's data chunk through a memory map.
+
+    The input is copied to the output first unless both paths are the same file,
+    in which case the carrier is modified in place.
+
+    :param input_file_path: Path to the input audio file
+    :param output_file_path: Path to the output encoded audio file
+    :param full_bits: uint8 array of header and message bits
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param embed: Function writing bits into a uint8 array of carrier bytes
+    :param per_sample: Embed only into the least significant byte of each sample
+    :param workers: Number of threads embedding contiguous carrier ranges in parallel
+    """
+    watch = METRICS.stopwatch("encode_mmap")
+    if not (os.path.exists(output_file_path) and os.path.samefile(input_file_path, output_file_path)):
+        shutil.copyfile(input_file_path, output_file_path)
+    watch.lap("copy")
+
+    with open(output_file_path, 'r+b') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE) as mm:
+        data_offset, data_size = find_data_chunk(mm)
+        sampwidth = read_sample_width(mm)
+
+        # Mapping the data chunk is lazy: only the pages holding the payload are touched
+        frame_bytes = np.frombuffer(mm, dtype=np.uint8, count=data_size, offset=data_offset)
+        carrier = None
+        try:
+            carrier = carrier_bytes(frame_bytes, sampwidth, per_sample)
+            if len(full_bits) > len(carrier) * bits_per_byte:
+                raise ValueError("The secret message is too large to fit in the audio file.")
+            watch.lap("map")
+            parallel_embed(carrier, full_bits, bits_per_byte, embed, workers)
+            watch.lap("embed")
+        except BaseException as e:
+            traceback.clear_frames(e.__traceback__)  # The failed calls' frames still hold views into the map
+            raise
+        finally:
+            del frame_bytes, carrier  # Release the exported buffer before the map is closed
+        mm.flush()
+        watch.lap("write")
+        watch.count("payload_bits", len(full_bits))
+
+def mmap_decode(input_file_path, bits_per_byte, extract, per_sample=False, workers=1):
+    """
+    Extracts a length-prefixed payload by reading only the mapped bytes that carry it.
+
+    :param input_file_path: Path to the encoded audio file
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param per_sample: Read only the least significant byte of each sample
+    :param workers: Number of threads extracting contiguous carrier ranges in parallel
+    :return: The decoded secret message
+    """
+    watch = METRICS.stopwatch("decode_mmap")
+    with open(input_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data_offset, data_size = find_data_chunk(mm)
+        sampwidth = read_sample_width(mm)
+
+        frame_bytes = np.frombuffer(mm, dtype=np.uint8, count=data_size, offset=data_offset)
+        carrier = None
+        try:
+            carrier = carrier_bytes(frame_bytes, sampwidth, per_sample)
+            watch.lap("map")
+            header_bytes = min(HEADER_READ_BITS // bits_per_byte, len(carrier))
+            payload_length = payload_length_bits(extract(carrier, header_bytes))
+            if payload_length > len(carrier) * bits_per_byte:
+                raise ValueError("The extracted message length is larger than the available audio data.")
+
+            # extract returns a copy, so the payload holds no reference into the map
+            payload_bytes = -(-payload_length // bits_per_byte)
+            payload_bits = parallel_extract(carrier, payload_bytes, extract, 0, workers)[:payload_length]
+            watch.lap("extract")
+        except BaseException as e:
+            traceback.clear_frames(e.__traceback__)  # The failed calls' frames still hold views into the map
+            raise
+        finally:
+            del frame_bytes, carrier  # Release the exported buffer before the map is closed
+        decoded_message = bits_to_message(payload_bits)
+        watch.lap("unpack")
+        watch.count("payload_bits", payload_length)
+        return decoded_message
+
+def mmap_probe(input_file_path, bits_per_byte, extract, per_sample=False):
+    """
+    Reads only the payload header through a memory map and checks that it describes a payload that fits.
+    Files that are not RIFF/WAVE or RF64 are read through ``open_audio`` instead.
+
+    :param input_file_path: Path to the audio file
+    :param bits_per_byte: Number of payload bits stored in each carrier byte
+    :param extract: Function reading ``count`` carrier bytes into an array of bits
+    :param per_sample: Read only the least significant byte of each sample
+    :return: Tuple of (payload length in bits, whether the payload carries a checksum)
+    """
+    if not is_mappable(input_file_path):
+        # The samples of other containers such as AIFF are not stored in WAV layout, so the frames are read whole
+        with open_audio(input_file_path, 'rb') as audio:
+            sampwidth = audio.getsampwidth()
+            frame_bytes = np.frombuffer(audio.readframes(audio.getnframes()), dtype=np.uint8)
+        carrier = carrier_bytes(frame_bytes, sampwidth, per_sample)
+        header = extract(carrier, min(HEADER_READ_BITS // bits_per_byte, len(carrier)))
+        capacity = len(carrier) * bits_per_byte
+    else:
+        with open(input_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_offset, data_size = find_data_chunk(mm)
+            frame_bytes = np.frombuffer(mm, dtype=np.uint8, count=data_size, offset=data_offset)
+            carrier = None
+            try:
+                carrier = carrier_bytes(frame_bytes, read_sample_width(mm), per_sample)
+                header = extract(carrier, min(HEADER_READ_BITS // bits_per_byte, len(carrier)))
+                capacity = len(carrier) * bits_per_byte
+            except BaseException as e:
+                traceback.clear_frames(e.__traceback__)  # The failed calls' frames still hold views into the map
+                raise
+            finally:
+                del frame_bytes, carrier  # Release the exported buffer before the map is closed
+    payload_length = payload_length_bits(header)
+    if payload_length > capacity:
+        raise ValueError("The extracted message length is larger than the available audio data.")
+    return payload_length, payload_checked(header)
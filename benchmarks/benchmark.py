@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+from cli.config import ALGORITHMS
+from algorithms.bit_packing import message_bit_length
+
+SAMPLE_RATE = 44100
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+def generate_wav(file_path, seconds, sampwidth, nchannels, seed=0):
+    """
+    Writes a synthetic WAV file filled with random samples.
+
+    :param file_path: Path of the WAV file to create
+    :param seconds: Duration in seconds
+    :param sampwidth: Sample width in bytes (1, 2 or 4)
+    :param nchannels: Number of channels
+    :param seed: Seed for the sample generator
+    """
+    rng = np.random.default_rng(seed)
+    info = np.iinfo(SAMPLE_DTYPES[sampwidth])
+    samples = rng.integers(info.min, info.max, size=int(seconds * SAMPLE_RATE) * nchannels, dtype=SAMPLE_DTYPES[sampwidth], endpoint=True)
+    with wave.open(file_path, 'wb') as audio:
+        audio.setnchannels(nchannels)
+        audio.setsampwidth(sampwidth)
+        audio.setframerate(SAMPLE_RATE)
+        audio.writeframes(samples.astype(samples.dtype.newbyteorder('<')).tobytes())
+
+def generate_message(size, seed=0):
+    """Returns a random printable ASCII message of the given size in characters."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(32, 127, size=size, dtype=np.uint8).tobytes().decode('ascii')
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of the current process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes
+
+def percentiles(latencies):
+    """Returns the p50/p90/p99 latencies in milliseconds."""
+    values = np.percentile(np.asarray(latencies) * 1000, [50, 90, 99])
+    return {"p50_ms": float(values[0]), "p90_ms": float(values[1]), "p99_ms": float(values[2])}
+
+def run_case(algo_choice, operation, carrier_path, message, repeat, work_dir):
+    """
+    Times one algorithm operation in a fresh worker process so peak RSS is attributed to this case only.
+
+    :return: Dictionary with latency percentiles, throughput, peak RSS and correctness
+    """
+    logging.disable(logging.INFO)  # Keep per-call log lines out of the timings
+    algorithm = ALGORITHMS[algo_choice]
+    output_path = os.path.join(work_dir, f"encoded_{algo_choice}_{os.getpid()}.wav")
+    # Decode always runs on a carrier produced by the same algorithm
+    if algorithm['encode'](carrier_path, output_path, message) is None:
+        raise RuntimeError(f"{algorithm['name']} failed to encode the benchmark payload")
+
+    latencies = []
+    correct = True
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if operation == "encode":
+            result = algorithm['encode'](carrier_path, output_path, message)
+        else:
+            result = algorithm['decode'](output_path)
+            correct = correct and result == message
+        latencies.append(time.perf_counter() - start)
+    os.remove(output_path)
+
+    carrier_bytes = os.path.getsize(carrier_path)
+    return {
+        **percentiles(latencies),
+        "mb_per_s": carrier_bytes / float(np.median(latencies)) / 1e6,
+        "peak_rss_mb": peak_rss_bytes() / 1e6,
+        "correct": bool(correct and result is not None),
+    }
+
+def run_benchmarks(algo_choices, durations, sampwidths, channels, payload_sizes, repeat):
+    """
+    Runs every selected algorithm over the grid of carriers and payload sizes.
+
+    :return: List of result dictionaries, one per (algorithm, carrier, payload, operation)
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for seconds in durations:
+            for sampwidth in sampwidths:
+                for nchannels in channels:
+                    carrier_path = os.path.join(work_dir, f"carrier_{seconds}s_{sampwidth * 8}bit_{nchannels}ch.wav")
+                    generate_wav(carrier_path, seconds, sampwidth, nchannels)
+                    nframes = int(seconds * SAMPLE_RATE)
+
+                    for payload_size in payload_sizes:
+                        message = generate_message(payload_size)
+                        for algo_choice in algo_choices:
+                            algorithm = ALGORITHMS[algo_choice]
+                            if message_bit_length(message) > algorithm['capacity'](nframes, sampwidth, nchannels):
+                                continue
+                            for operation in ("encode", "decode"):
+                                with ProcessPoolExecutor(max_workers=1) as executor:
+                                    metrics = executor.submit(run_case, algo_choice, operation, carrier_path, message, repeat, work_dir).result()
+                                results.append({
+                                    "algorithm": algorithm['name'],
+                                    "operation": operation,
+                                    "seconds": seconds,
+                                    "sampwidth": sampwidth,
+                                    "nchannels": nchannels,
+                                    "carrier_bytes": os.path.getsize(carrier_path),
+                                    "payload_bytes": payload_size,
+                                    **metrics,
+                                })
+                                print(".", end="", file=sys.stderr, flush=True)
+                    os.remove(carrier_path)
+    print(file=sys.stderr)
+    return results
+
+def result_key(result):
+    """Returns the grid coordinates identifying a result across runs."""
+    return (result["algorithm"], result["operation"], result["seconds"], result["sampwidth"], result["nchannels"], result["payload_bytes"])
+
+def print_table(results, baseline=None):
+    """
+    Prints the results as a readable table, with the speedup over a baseline run when given.
+
+    :param results: List of result dictionaries
+    :param baseline: Optional list of result dictionaries from an earlier run
+    """
+    previous = {result_key(result): result for result in baseline or []}
+    header = f"{'algorithm':<48} {'op':<6} {'carrier':>16} {'payload':>9} {'p50 ms':>9} {'p99 ms':>9} {'MB/s':>9} {'RSS MB':>8} ok"
+    if baseline is not None:
+        header += f" {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        carrier = f"{result['seconds']}s/{result['sampwidth'] * 8}b/{result['nchannels']}ch"
+        line = (f"{result['algorithm']:<48} {result['operation']:<6} {carrier:>16} {result['payload_bytes']:>9} "
+                f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['mb_per_s']:>9.1f} {result['peak_rss_mb']:>8.1f} "
+                f"{'y' if result['correct'] else 'n':>2}")
+        if baseline is not None:
+            before = previous.get(result_key(result))
+            line += f" {before['p50_ms'] / result['p50_ms']:>7.2f}x" if before else f" {'-':>8}"
+        print(line)
+
+def main():
+    """Parses the command line and runs the benchmark grid."""
+    parser = argparse.ArgumentParser(description="Benchmark the encode/decode throughput of every algorithm in cli/config.ALGORITHMS.")
+    parser.add_argument("-a", "--algorithms", type=int, nargs="+", choices=sorted(ALGORITHMS), default=sorted(ALGORITHMS), help="Algorithm keys to benchmark")
+    parser.add_argument("--durations", type=float, nargs="+", default=[1, 10, 60], help="Carrier durations in seconds")
+    parser.add_argument("--sampwidths", type=int, nargs="+", choices=sorted(SAMPLE_DTYPES), default=[2], help="Sample widths in bytes")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2], help="Channel counts")
+    parser.add_argument("--payloads", type=int, nargs="+", default=[64, 4096, 65536], help="Payload sizes in characters")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timed calls per case")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.algorithms, args.durations, args.sampwidths, args.channels, args.payloads, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,142 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+
 from utils.logging_util import setup_logger
+from utils.metrics import METRICS
+from algorithms.audio_io import open_audio
+from cli.config import ALGORITHMS
+from cli.helpers import use_streaming
+from cli.batch import collect_files, run_jobs
+from cli.output_cache import cached_encode
 
 logger = setup_logger(__name__)
 
-def calculate_accuracy(original_message, algorithm, input_file_path, output_file_path):
+# Frames compared per block, so memory stays bounded for multi-GB files
+METRICS_BLOCK_FRAMES = 65536
+
+def message_metrics(original_message, decoded_message):
+    """
+    Compares a decoded message with the original one.
+
+    Bits and characters missing from (or added to) the decoded message count as errors.
+
+    :param original_message: The original secret message
+    :param decoded_message: The decoded message, or None if decoding failed
+    :return: Dictionary with the bit error rate and the character accuracy as a percentage
+    """
+    decoded_message = decoded_message or ""
+    original_bits = np.unpackbits(np.frombuffer(original_message.encode('utf-8'), dtype=np.uint8))
+    decoded_bits = np.unpackbits(np.frombuffer(decoded_message.encode('utf-8'), dtype=np.uint8))
+    common = min(len(original_bits), len(decoded_bits))
+    total_bits = max(len(original_bits), len(decoded_bits))
+    bit_errors = np.count_nonzero(original_bits[:common] != decoded_bits[:common]) + total_bits - common
+
+    # UTF-32 gives one fixed-width code unit per character, so characters compare element-wise
+    original_chars = np.frombuffer(original_message.encode('utf-32-le'), dtype=np.uint32)
+    decoded_chars = np.frombuffer(decoded_message.encode('utf-32-le'), dtype=np.uint32)
+    common = min(len(original_chars), len(decoded_chars))
+    matches = np.count_nonzero(original_chars[:common] == decoded_chars[:common])
+
+    return {
+        "bit_error_rate": float(bit_errors) / total_bits if total_bits else 0.0,
+        "char_accuracy": float(matches) / len(original_chars) * 100 if len(original_chars) else 100.0,
+    }
+
+def samples_from_bytes(frame_bytes, sampwidth):
+    """
+    Converts little-endian PCM frame bytes into signed sample values.
+
+    :param frame_bytes: uint8 array of frame bytes
+    :param sampwidth: Sample width in bytes (1, 2, 3 or 4)
+    :return: int64 array with one element per sample
+    """
+    if sampwidth == 1:  # 8-bit WAV samples are unsigned
+        return frame_bytes.astype(np.int64) - 128
+    if sampwidth == 3:
+        triples = frame_bytes[:len(frame_bytes) - len(frame_bytes) % 3].reshape(-1, 3).astype(np.int64)
+        values = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        return values - ((values & 0x800000) << 1)  # Sign-extend from 24 bits
+    dtype = np.dtype(f"<i{sampwidth}")
+    return np.frombuffer(frame_bytes[:len(frame_bytes) - len(frame_bytes) % sampwidth], dtype=dtype).astype(np.int64)
+
+def audio_metrics(carrier_file_path, stego_file_path, block_frames=METRICS_BLOCK_FRAMES):
+    """
+    Measures how much the stego file deviates from its carrier, reading both block by block.
+
+    :param carrier_file_path: Path to the original audio file
+    :param stego_file_path: Path to the encoded audio file
+    :param block_frames: Number of frames compared per block
+    :return: Dictionary with SNR and PSNR in dB, the maximum absolute sample deviation and the changed sample ratio
+    """
+    with open_audio(carrier_file_path, mode='rb') as carrier, open_audio(stego_file_path, mode='rb') as stego:
+        if carrier.getparams()[:3] != stego.getparams()[:3] or carrier.getnframes() != stego.getnframes():
+            raise ValueError("The carrier and stego files have different audio parameters.")
+        sampwidth = carrier.getsampwidth()
+
+        signal_power = noise_power = 0.0
+        max_deviation = changed = samples = 0
+        while True:
+            original = carrier.readframes(block_frames)
+            if not original:
+                break
+            x = samples_from_bytes(np.frombuffer(original, dtype=np.uint8), sampwidth)
+            y = samples_from_bytes(np.frombuffer(stego.readframes(block_frames), dtype=np.uint8), sampwidth)
+            difference = y - x
+            signal_power += float(np.dot(x.astype(np.float64), x))
+            noise_power += float(np.dot(difference.astype(np.float64), difference))
+            if difference.size:
+                max_deviation = max(max_deviation, int(np.abs(difference).max()))
+            changed += int(np.count_nonzero(difference))
+            samples += x.size
+
+    peak = float(1 << (8 * sampwidth - 1))
+    mse = noise_power / samples if samples else 0.0
+    return {
+        "snr_db": 10 * math.log10(signal_power / noise_power) if noise_power else math.inf,
+        "psnr_db": 10 * math.log10(peak * peak / mse) if mse else math.inf,
+        "max_deviation": max_deviation,
+        "changed_samples": changed / samples if samples else 0.0,
+    }
+
+def ecc_corrected():
+    """Returns how many codewords the ECC layer has corrected in this process so far."""
+    return METRICS.snapshot()["counters"].get("ecc", {}).get("corrected_codewords", 0)
+
+def evaluate(original_message, algorithm, input_file_path, output_file_path, reencode=True):
+    """
+    Computes message and audio quality metrics for one carrier and its stego file.
+
+    Large files are encoded and decoded with the streaming functions, so memory stays bounded.
+
+    :param original_message: The original secret message
+    :param algorithm: The algorithm object containing encode and decode methods
+    :param input_file_path: Path to the input audio file used for encoding
+    :param output_file_path: Path to the encoded audio file
+    :param reencode: Encode the message into the output file first; when False the existing output file is evaluated
+    :return: Dictionary of metrics, including the decoded message and the codewords corrected by the ECC layer
+    """
+    streaming = use_streaming(input_file_path)
+    if reencode:
+        encode = algorithm['encode_streaming'] if streaming else algorithm['encode']
+        os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+        if cached_encode(algorithm, encode, input_file_path, output_file_path, original_message) is None:
+            raise ValueError("Encoding failed.")
+
+    decode = algorithm['decode_streaming'] if streaming else algorithm['decode']
+    corrected_before = ecc_corrected()
+    decoded_message = decode(output_file_path)
+    return {
+        "decoded_message": decoded_message,
+        "ecc_corrected": ecc_corrected() - corrected_before,
+        **message_metrics(original_message, decoded_message),
+        **audio_metrics(input_file_path, output_file_path),
+    }
+
+def calculate_accuracy(original_message, algorithm, input_file_path, output_file_path, reencode=True):
     """
     Calculates the accuracy of the decoded message compared to the original message.
 
@@ -10,6 +144,7 @@ def calculate_accuracy(original_message, algorithm, input_file_path, output_file
     :param algorithm: The algorithm object containing encode and decode methods
     :param input_file_path: Path to the input audio file used for encoding
     :param output_file_path: Path to the output audio file used for decoding
+    :param reencode: Encode the message first; when False the existing output file is evaluated
     :return: The accuracy of the decoded message as a percentage
     """
     try:
@@ -17,28 +152,77 @@ def calculate_accuracy(original_message, algorithm, input_file_path, output_file
         if not all([original_message, algorithm, input_file_path, output_file_path]):
             raise ValueError("One or more input parameters are missing.")
 
-        # Encode the message into the audio file
-        algorithm['encode'](input_file_path, output_file_path, original_message)
-
-        # Decode the message from the output audio file
-        decoded_message = algorithm['decode'](output_file_path)
-
-        if decoded_message is None:
-            logger.error("Decoded message is None.")
-            return 0.0
-
-        if not decoded_message:
-            logger.error("Decoded message is empty.")
-            return 0.0
-
-        # Calculate the accuracy of the decoded message
-        matches = sum(a == b for a, b in zip(original_message, decoded_message))
-        accuracy = (matches / len(original_message)) * 100
+        metrics = evaluate(original_message, algorithm, input_file_path, output_file_path, reencode)
+        if not metrics["decoded_message"]:
+            logger.error("Decoded message is None or empty.")
 
+        accuracy = metrics["char_accuracy"]
         logger.info(f"Accuracy of decoded message: {accuracy:.2f}%")
         print(f"Accuracy of decoded message: {accuracy:.2f}%")
+        print(f"Bit error rate: {metrics['bit_error_rate']:.6f}")
+        print(f"SNR: {metrics['snr_db']:.2f} dB, PSNR: {metrics['psnr_db']:.2f} dB")
+        print(f"Max sample deviation: {metrics['max_deviation']} ({metrics['changed_samples'] * 100:.2f}% of samples changed)")
+        if metrics["ecc_corrected"]:
+            print(f"ECC corrected codewords: {metrics['ecc_corrected']}")
         return accuracy
 
     except Exception as e:
         logger.error(f"Error during accuracy calculation: {e}")
         return 0.0
+
+def evaluate_job(algo_choice, input_file, output_file, original_message, reencode):
+    """
+    Evaluates one carrier in a worker process.
+
+    :return: Tuple of (input file, metrics dictionary or None on failure, elapsed seconds)
+    """
+    start = time.perf_counter()
+    try:
+        metrics = evaluate(original_message, ALGORITHMS[algo_choice], input_file, output_file, reencode)
+    except Exception as e:
+        logger.error(f"Error evaluating {input_file}: {e}")
+        metrics = None
+    return input_file, metrics, time.perf_counter() - start
+
+def evaluate_batch(algo_choice, source, encoded_dir, original_message, reencode=False, max_ber=0.0, min_snr=None, workers=None, json_path=None):
+    """
+    Evaluates every carrier of a directory or manifest against its stego file, as a regression gate.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param source: Directory or manifest file listing the carrier audio files
+    :param encoded_dir: Directory holding the stego files, mirroring the source layout as written by encode-batch
+    :param original_message: The message that was (or is to be) encoded
+    :param reencode: Encode the message into the stego files first instead of evaluating the existing ones
+    :param max_ber: Highest bit error rate that passes
+    :param min_snr: Lowest SNR in dB that passes, or None to skip the check
+    :param workers: Number of worker processes (None uses the CPU count)
+    :param json_path: Write the per-file metrics as JSON to this file
+    :return: Number of files that failed the gate
+    """
+    files = collect_files(source)
+    logger.info(f"Evaluating {len(files)} files using {ALGORITHMS[algo_choice]['name']}")
+    job_args = [(algo_choice, path, os.path.join(encoded_dir, relative), original_message, reencode) for path, relative in files]
+    results = sorted(run_jobs(evaluate_job, job_args, workers, "Evaluating files"), key=lambda result: result[0])
+
+    failed = 0
+    for input_file, metrics, elapsed in results:
+        passed = (metrics is not None and metrics["bit_error_rate"] <= max_ber
+                  and (min_snr is None or metrics["snr_db"] >= min_snr))
+        failed += not passed
+        if metrics is None:
+            print(f"FAILED {input_file} ({elapsed:.3f}s)")
+        else:
+            print(f"{'OK    ' if passed else 'FAILED'} {input_file}: BER {metrics['bit_error_rate']:.6f}, "
+                  f"chars {metrics['char_accuracy']:.2f}%, SNR {metrics['snr_db']:.2f} dB, PSNR {metrics['psnr_db']:.2f} dB, "
+                  f"max deviation {metrics['max_deviation']}, ECC corrected {metrics['ecc_corrected']} ({elapsed:.3f}s)")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            # Infinite SNR (an untouched carrier) is written as null to keep the file valid JSON
+            rows = [{"file": input_file, **{key: (None if value == math.inf else value) for key, value in (metrics or {}).items()}}
+                    for input_file, metrics, _ in results]
+            json.dump(rows, f, indent=2)
+
+    print(f"\n{len(results)} files, {failed} failed")
+    logger.info(f"Evaluation finished: {len(results)} files, {failed} failed")
+    return failed
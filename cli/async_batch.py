@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+
+from utils.logging_util import setup_logger
+from cli.config import ALGORITHMS, ASYNC_CONCURRENCY
+from cli.helpers import use_streaming
+from cli.batch import collect_files, report
+from cli import output_cache
+
+logger = setup_logger(__name__)
+
+async def encode(algo_choice, input_file, output_file, secret_message, io_executor=None):
+    """
+    Encodes a message on an I/O thread, streaming the carrier block by block into the output file.
+
+    A file in flight holds one block in memory whatever its size, and its output is written in the
+    container its extension names, as in the process-pool batch. File reads and writes and the NumPy
+    embedding release the GIL, so the files in flight overlap each other's I/O and embedding.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param input_file: Path to the input audio file
+    :param output_file: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :param io_executor: Executor running the encode (None uses the loop's default executor)
+    :return: Tuple of (input file, output file or None on failure, elapsed seconds)
+    """
+    loop = asyncio.get_running_loop()
+    algorithm = ALGORITHMS[algo_choice]
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    result = await loop.run_in_executor(io_executor, output_cache.cached_encode, algorithm,
+                                        algorithm['encode_streaming'], input_file, output_file, secret_message)
+    return input_file, result, time.perf_counter() - start
+
+async def decode(algo_choice, input_file, io_executor=None):
+    """
+    Decodes a message on an I/O thread.
+
+    Decoding only reads the frames that carry the payload, so it is bound by I/O latency
+    and runs entirely on the I/O executor.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param input_file: Path to the encoded audio file
+    :param io_executor: Executor for file reads (None uses the loop's default executor)
+    :return: Tuple of (input file, decoded message or None on failure, elapsed seconds)
+    """
+    loop = asyncio.get_running_loop()
+    algorithm = ALGORITHMS[algo_choice]
+    decode_file = algorithm['decode_streaming'] if use_streaming(input_file) else algorithm['decode']
+    start = time.perf_counter()
+    result = await loop.run_in_executor(io_executor, decode_file, input_file)
+    return input_file, result, time.perf_counter() - start
+
+async def run_jobs(job, job_args, concurrency, desc, **executors):
+    """
+    Runs coroutine jobs with at most ``concurrency`` files in flight and a progress bar over files.
+
+    :param job: Coroutine function
+    :param job_args: List of argument tuples, one per file
+    :param concurrency: Maximum number of files being read, processed or written at once
+    :param desc: Progress bar description
+    :param executors: Executors passed to every job
+    :return: List of (input file, result, elapsed seconds) tuples in completion order; a job that raised has a None result
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(args):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                return await job(*args, **executors)
+            except Exception as e:  # One bad file must not abort the batch
+                logger.error(f"Error processing {args[1]}: {e}")
+                return args[1], None, time.perf_counter() - start
+
+    results = []
+    tasks = [asyncio.ensure_future(limited(args)) for args in job_args]
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=desc, unit="file"):
+        results.append(await task)
+    return results
+
+def encode_batch(algo_choice, source, output_dir, secret_message, concurrency=ASYNC_CONCURRENCY):
+    """
+    Encodes the same secret message into every file of a directory or manifest with up to ``concurrency`` files in flight.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param source: Directory or manifest file listing the input audio files
+    :param output_dir: Directory receiving the encoded files, mirroring the source layout
+    :param secret_message: The message to be encoded
+    :param concurrency: Maximum number of files in flight
+    :return: Number of failed files
+    """
+    files = collect_files(source)
+    logger.info(f"Async batch encoding {len(files)} files using {ALGORITHMS[algo_choice]['name']}")
+    job_args = [(algo_choice, path, os.path.join(output_dir, relative), secret_message) for path, relative in files]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as io_executor:
+        results = asyncio.run(run_jobs(encode, job_args, concurrency, "Encoding files", io_executor=io_executor))
+    return report(results, time.perf_counter() - start)
+
+def decode_batch(algo_choice, source, concurrency=ASYNC_CONCURRENCY):
+    """
+    Decodes every file of a directory or manifest with up to ``concurrency`` reads in flight.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param source: Directory or manifest file listing the encoded audio files
+    :param concurrency: Maximum number of files in flight
+    :return: Number of failed files
+    """
+    files = collect_files(source)
+    logger.info(f"Async batch decoding {len(files)} files using {ALGORITHMS[algo_choice]['name']}")
+    job_args = [(algo_choice, path) for path, _ in files]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as io_executor:
+        results = asyncio.run(run_jobs(decode, job_args, concurrency, "Decoding files", io_executor=io_executor))
+    return report(results, time.perf_counter() - start)
@@ -0,0 +1,155 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+from utils.logging_util import setup_logger
+from utils.metrics import METRICS, run_with_metrics
+from cli.config import ALGORITHMS, AUDIO_FILE_EXTENSIONS
+from cli.helpers import use_streaming
+from cli.output_cache import cached_encode
+
+logger = setup_logger(__name__)
+
+def collect_files(source):
+    """
+    Collects the audio files to process from a directory tree or a manifest file.
+
+    :param source: A directory (searched recursively) or a manifest listing one file path per line
+    :return: List of (file path, path relative to the source directory or the manifest entries' common directory) tuples
+    """
+    if os.path.isdir(source):
+        files = []
+        for root, _, names in os.walk(source):
+            for name in sorted(names):
+                if name.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    files.append((path, os.path.relpath(path, source)))
+        return sorted(files)
+
+    with open(source) as manifest:
+        paths = {}
+        for line in manifest:
+            if line.strip() and not line.startswith('#'):
+                paths.setdefault(os.path.abspath(line.strip()), line.strip())  # Files listed twice are processed once
+    if not paths:
+        return []
+    # Outputs mirror the layout below the entries' common directory, so equal names in different directories do not collide
+    root = os.path.commonpath([os.path.dirname(absolute) for absolute in paths])
+    return [(path, os.path.relpath(absolute, root)) for absolute, path in paths.items()]
+
+def encode_job(algo_choice, input_file, output_file, secret_message):
+    """
+    Encodes one file in a worker process.
+
+    :return: Tuple of (input file, output file or None on failure, elapsed seconds)
+    """
+    algorithm = ALGORITHMS[algo_choice]
+    encode = algorithm['encode_streaming'] if use_streaming(input_file) else algorithm['encode']
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    start = time.perf_counter()
+    result = cached_encode(algorithm, encode, input_file, output_file, secret_message)
+    return input_file, result, time.perf_counter() - start
+
+def decode_job(algo_choice, input_file):
+    """
+    Decodes one file in a worker process.
+
+    :return: Tuple of (input file, decoded message or None on failure, elapsed seconds)
+    """
+    algorithm = ALGORITHMS[algo_choice]
+    decode = algorithm['decode_streaming'] if use_streaming(input_file) else algorithm['decode']
+    start = time.perf_counter()
+    result = decode(input_file)
+    return input_file, result, time.perf_counter() - start
+
+def run_jobs(job, job_args, workers, desc, input_index=1):
+    """
+    Runs jobs over a process pool with a progress bar over files.
+
+    A job that raises is logged and reported with a None result, so one bad file does not abort the batch.
+
+    :param job: Top-level worker function
+    :param job_args: List of argument tuples, one per file
+    :param workers: Number of worker processes (None uses the CPU count)
+    :param desc: Progress bar description
+    :param input_index: Position of the input file in each argument tuple, reported for jobs that raise
+    :return: List of (input file, result, elapsed seconds) tuples in completion order
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_with_metrics, job, *args): args for args in job_args}
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc, unit="file"):
+            try:
+                result, metrics = future.result()
+            except Exception as e:
+                input_file = futures[future][input_index]
+                logger.error(f"Error processing {input_file}: {e}")
+                results.append((input_file, None, 0.0))
+                continue
+            METRICS.merge(metrics)  # Collect the timings recorded in the worker process
+            results.append(result)
+    return results
+
+def report(results, wall_time):
+    """
+    Prints per-file results and overall throughput.
+
+    :param results: List of (input file, result, elapsed seconds) tuples
+    :param wall_time: Total elapsed seconds for the batch
+    :return: Number of failed files
+    """
+    failed = 0
+    total_bytes = 0
+    for input_file, result, elapsed in sorted(results):
+        try:
+            total_bytes += os.path.getsize(input_file)
+        except OSError:  # Missing files are already reported as failed
+            pass
+        if result is None:
+            failed += 1
+            print(f"FAILED {input_file} ({elapsed:.3f}s)")
+        else:
+            print(f"OK     {input_file} -> {result} ({elapsed:.3f}s)")
+
+    wall_time = max(wall_time, 1e-9)
+    print(f"\n{len(results)} files, {failed} failed in {wall_time:.2f}s "
+          f"({len(results) / wall_time:.1f} files/s, {total_bytes / wall_time / 1e6:.1f} MB/s)")
+    logger.info(f"Batch finished: {len(results)} files, {failed} failed in {wall_time:.2f}s")
+    return failed
+
+def encode_batch(algo_choice, source, output_dir, secret_message, workers=None):
+    """
+    Encodes the same secret message into every file of a directory or manifest.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param source: Directory or manifest file listing the input audio files
+    :param output_dir: Directory receiving the encoded files, mirroring the source layout
+    :param secret_message: The message to be encoded
+    :param workers: Number of worker processes (None uses the CPU count)
+    :return: Number of failed files
+    """
+    files = collect_files(source)
+    logger.info(f"Batch encoding {len(files)} files using {ALGORITHMS[algo_choice]['name']}")
+    job_args = [(algo_choice, path, os.path.join(output_dir, relative), secret_message) for path, relative in files]
+
+    start = time.perf_counter()
+    results = run_jobs(encode_job, job_args, workers, "Encoding files")
+    return report(results, time.perf_counter() - start)
+
+def decode_batch(algo_choice, source, workers=None):
+    """
+    Decodes every file of a directory or manifest.
+
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param source: Directory or manifest file listing the encoded audio files
+    :param workers: Number of worker processes (None uses the CPU count)
+    :return: Number of failed files
+    """
+    files = collect_files(source)
+    logger.info(f"Batch decoding {len(files)} files using {ALGORITHMS[algo_choice]['name']}")
+    job_args = [(algo_choice, path) for path, _ in files]
+
+    start = time.perf_counter()
+    results = run_jobs(decode_job, job_args, workers, "Decoding files")
+    return report(results, time.perf_counter() - start)
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+
+from utils.logging_util import setup_logger
+from algorithms.audio_io import open_audio
+from cli.config import ALGORITHMS, AUDIO_FILE_EXTENSIONS
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    nframes INTEGER NOT NULL,
+    sampwidth INTEGER NOT NULL,
+    nchannels INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS capacities (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    algorithm TEXT NOT NULL,
+    capacity_bits INTEGER NOT NULL,
+    PRIMARY KEY (path, algorithm)
+);
+CREATE INDEX IF NOT EXISTS capacities_by_algorithm ON capacities (algorithm, capacity_bits);
+"""
+
+def open_index(index_path):
+    """
+    Opens (and creates if needed) the SQLite capacity index.
+
+    :param index_path: Path to the SQLite database file
+    :return: An open sqlite3 connection
+    """
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    connection = sqlite3.connect(index_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+def read_header(file_path):
+    """
+    Reads only the WAV header of a file.
+
+    :param file_path: Path to the audio file
+    :return: Tuple of (nframes, sampwidth, nchannels)
+    """
+    with open_audio(file_path, mode='rb') as audio:
+        return audio.getnframes(), audio.getsampwidth(), audio.getnchannels()
+
+def scan(root, index_path):
+    """
+    Updates the capacity index for every audio file under a directory tree.
+
+    Files whose mtime and size match the index are skipped; files that disappeared are dropped.
+
+    :param root: Directory to scan recursively
+    :param index_path: Path to the SQLite database file
+    :return: Tuple of (files indexed or refreshed, files unchanged, files that could not be read)
+    """
+    refreshed = unchanged = failed = 0
+    seen = set()
+    with open_index(index_path) as connection:
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in connection.execute("SELECT path, mtime_ns, size FROM files")}
+
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if not name.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    continue
+                path = os.path.abspath(os.path.join(directory, name))
+                seen.add(path)
+                # Broken symlinks and files deleted mid-scan fail here and are skipped like unreadable headers
+                try:
+                    stat = os.stat(path)
+                    if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                        unchanged += 1
+                        continue
+                    nframes, sampwidth, nchannels = read_header(path)
+                except Exception as e:
+                    logger.error(f"Skipping {path}: {e}")
+                    connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                    failed += 1
+                    continue
+
+                connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, stat.st_mtime_ns, stat.st_size, nframes, sampwidth, nchannels),
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO capacities VALUES (?, ?, ?)",
+                    [(path, algo["name"], algo["capacity"](nframes, sampwidth, nchannels)) for algo in ALGORITHMS.values()],
+                )
+                refreshed += 1
+
+        root_prefix = os.path.join(os.path.abspath(root), '')
+        removed = [(path,) for path in known if path.startswith(root_prefix) and path not in seen]
+        connection.executemany("DELETE FROM files WHERE path = ?", removed)
+
+    connection.close()
+    logger.info(f"Capacity scan of {root}: {refreshed} indexed, {unchanged} unchanged, {failed} unreadable, {len(removed)} removed")
+    return refreshed, unchanged, failed
+
+def find_carriers(index_path, algo_choice, message_bits, limit=10):
+    """
+    Looks up the smallest indexed carriers able to hold a message with the chosen algorithm.
+
+    :param index_path: Path to the SQLite database file
+    :param algo_choice: Key of the algorithm in ALGORITHMS
+    :param message_bits: Size of the message in bits
+    :param limit: Maximum number of carriers returned
+    :return: List of (file path, capacity in bits) tuples, smallest capacity first
+    """
+    with open_index(index_path) as connection:
+        rows = connection.execute(
+            "SELECT path, capacity_bits FROM capacities WHERE algorithm = ? AND capacity_bits >= ? "
+            "ORDER BY capacity_bits LIMIT ?",
+            (ALGORITHMS[algo_choice]["name"], message_bits, limit),
+        ).fetchall()
+    connection.close()
+    return rows
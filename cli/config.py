@@ -3,32 +3,41 @@ STANDARD_INPUT_FILE_PATH = "input/original_sample.wav"
 OUTPUT_BASIC_LSB = "output/basic_lsb_encoded.wav"
 OUTPUT_ENHANCED_LSB_FLIP = "output/enhanced_lsb_encoded_flip.wav"
 OUTPUT_ENHANCED_LSB_NO_FLIP = "output/enhanced_lsb_encoded_no_flip.wav"
+OUTPUT_SAMPLE_LSB = "output/sample_lsb_encoded.wav"
+OUTPUT_SCATTER_LSB = "output/scatter_lsb_encoded.wav"
 
-# Import algorithm modules
-from algorithms import (
-    basic_lsb_steganography,
-    enhanced_lsb_steganography_with_flip,
-    enhanced_lsb_steganography_no_flip,
-)
-
-# Dictionary to store algorithms
-ALGORITHMS = {
-    1: {
-        "name": "Basic LSB Steganography",
-        "encode": basic_lsb_steganography.encode,
-        "decode": basic_lsb_steganography.decode,
-        "output_file": OUTPUT_BASIC_LSB
-    },
-    2: {
-        "name": "Enhanced LSB Steganography with Bit Flipping",
-        "encode": enhanced_lsb_steganography_with_flip.encode,
-        "decode": enhanced_lsb_steganography_with_flip.decode,
-        "output_file": OUTPUT_ENHANCED_LSB_FLIP
-    },
-    3: {
-        "name": "Enhanced LSB Steganography without Bit Flipping",
-        "encode": enhanced_lsb_steganography_no_flip.encode,
-        "decode": enhanced_lsb_steganography_no_flip.decode,
-        "output_file": OUTPUT_ENHANCED_LSB_NO_FLIP
-    }
-}
+# Input files larger than this are processed block by block instead of loaded whole
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+# File extensions picked up when a directory is processed in batch mode
+AUDIO_FILE_EXTENSIONS = (".wav", ".rf64", ".aif", ".aiff", ".aifc")
+
+# Files kept in flight at once by the asyncio batch front-end
+ASYNC_CONCURRENCY = 16
+
+# On-disk index of per-algorithm carrier capacities
+CAPACITY_INDEX_PATH = "output/capacity_index.sqlite"
+
+# Encoded files reused by --cache, evicted least recently used first beyond this total size
+OUTPUT_CACHE_DIR = "output/cache"
+OUTPUT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Local encode/decode service; each worker may have this many jobs waiting before requests are refused
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_QUEUE_PER_WORKER = 4
+# Request paths are resolved below this directory; absolute paths and ".." segments are refused
+SERVICE_ROOT = "."
+
+# Algorithms are registered by module path and imported only when first used
+from algorithms.registry import AlgorithmRegistry
+
+ALGORITHMS = AlgorithmRegistry()
+ALGORITHMS.register("Basic LSB Steganography", "algorithms.basic_lsb_steganography", OUTPUT_BASIC_LSB)
+ALGORITHMS.register("Enhanced LSB Steganography with Bit Flipping", "algorithms.enhanced_lsb_steganography_with_flip", OUTPUT_ENHANCED_LSB_FLIP)
+ALGORITHMS.register("Enhanced LSB Steganography without Bit Flipping", "algorithms.enhanced_lsb_steganography_no_flip", OUTPUT_ENHANCED_LSB_NO_FLIP)
+ALGORITHMS.register("Sample-aware LSB Steganography", "algorithms.sample_lsb_steganography", OUTPUT_SAMPLE_LSB)
+ALGORITHMS.register("Keyed Scatter LSB Steganography", "algorithms.scatter_lsb_steganography", OUTPUT_SCATTER_LSB)
+
+# Algorithms installed by other packages under the "audio_steganography.algorithms" entry point group
+ALGORITHMS.load_entry_points()
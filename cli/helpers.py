@@ -1,5 +1,6 @@
+import os
 from utils.logging_util import setup_logger
-from cli.config import ALGORITHMS, STANDARD_INPUT_FILE_PATH
+from cli.config import ALGORITHMS, STANDARD_INPUT_FILE_PATH, STREAMING_THRESHOLD_BYTES
 
 logger = setup_logger(__name__)
 
@@ -46,3 +47,7 @@ def display_algorithm_menu():
     """Displays the algorithm selection menu based on the ALGORITHMS dictionary."""
     options = [algo["name"] for algo in ALGORITHMS.values()]
     display_menu(options, "Select an algorithm")
+
+def use_streaming(file_path):
+    """Returns True when the file is large enough to be processed block by block."""
+    return os.path.isfile(file_path) and os.path.getsize(file_path) > STREAMING_THRESHOLD_BYTES
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 from tqdm import tqdm
@@ -5,9 +6,14 @@ from tqdm import tqdm
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(project_root)
 from utils.logging_util import setup_logger
-from cli.helpers import display_menu, get_user_choice, get_file_path, display_algorithm_menu
-from cli.config import ALGORITHMS
-from cli.accuracy import calculate_accuracy
+from utils.metrics import METRICS
+from utils.profiling import run_profiled
+from algorithms.audio_io import RAW_FORMAT_ENV_VAR
+from cli.helpers import display_menu, get_user_choice, get_file_path, display_algorithm_menu, use_streaming
+from cli.config import ALGORITHMS, CAPACITY_INDEX_PATH, SERVICE_HOST, SERVICE_PORT, SERVICE_ROOT, OUTPUT_CACHE_DIR, OUTPUT_CACHE_MAX_BYTES
+from cli.batch import encode_batch, decode_batch
+from cli import async_batch
+from cli.capacity_index import scan, find_carriers
 
 logger = setup_logger(__name__)
 
@@ -23,7 +29,7 @@ def handle_algorithm_choice(encode=True):
 
     if encode:
         secret_message = input("Enter the secret message to encode: ")
-        logger.info(f"Secret message to encode: {secret_message}")
+        logger.info(f"Secret message to encode: {len(secret_message)} characters")
         input_file = get_file_path(algo_choice, is_input=True)
         output_file = get_file_path(algo_choice, is_input=False)
         handle_encode(algo_choice, input_file, output_file, secret_message)
@@ -37,8 +43,9 @@ def handle_encode(algo_choice, input_file, output_file, secret_message):
     logger.info(f"Encoding using {algorithm['name']}. Output file will be: {output_file}")
     
     # Example of using tqdm for encoding progress
+    encode = algorithm['encode_streaming'] if use_streaming(input_file) else algorithm['encode']
     for _ in tqdm(range(1), desc="Encoding Progress"):
-        algorithm['encode'](input_file, output_file, secret_message)
+        encode(input_file, output_file, secret_message)
 
 def handle_decode(algo_choice, output_file):
     """Decodes a message using the chosen algorithm."""
@@ -46,8 +53,9 @@ def handle_decode(algo_choice, output_file):
     logger.info(f"Decoding using {algorithm['name']} and output file: {output_file}")
     
     # Example of using tqdm for decoding progress
+    decode = algorithm['decode_streaming'] if use_streaming(output_file) else algorithm['decode']
     for _ in tqdm(range(1), desc="Decoding Progress"):
-        decoded_message = algorithm['decode'](output_file)
+        decoded_message = decode(output_file)
     
     if decoded_message:
         print(f"Decoded message: {decoded_message}")
@@ -69,11 +77,16 @@ def handle_accuracy_check():
     input_file = get_file_path(algo_choice, is_input=True)
     output_file = get_file_path(algo_choice, is_input=False)
 
+    reencode = input("\nEncode the message again before measuring? (n evaluates the existing output file) (y/n): ").lower() != "n"
+
     algorithm = ALGORITHMS[algo_choice]
-    
+
+    # Imported here so the other commands start without loading NumPy
+    from cli.accuracy import calculate_accuracy
+
     # Example of using tqdm for accuracy calculation
     for _ in tqdm(range(1), desc="Accuracy Calculation Progress"):
-        calculate_accuracy(original_message, algorithm, input_file_path=input_file, output_file_path=output_file)
+        calculate_accuracy(original_message, algorithm, input_file_path=input_file, output_file_path=output_file, reencode=reencode)
 
 def handle_main_choice(choice):
     """Handles the user's main menu choice."""
@@ -91,8 +104,230 @@ def handle_main_choice(choice):
         logger.warning("Invalid choice entered by user.")
         print("\nEnter a valid choice!")
 
+def algorithm_number(value):
+    """
+    Parses an --algorithm argument. Built-in numbers are accepted without scanning the installed algorithms.
+
+    :param value: The argument text
+    :return: Key of the algorithm in ALGORITHMS
+    """
+    try:
+        key = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid algorithm number: {value!r}") from None
+    if key not in ALGORITHMS:
+        raise argparse.ArgumentTypeError(f"unknown algorithm {key} (choose from {', '.join(map(str, ALGORITHMS))})")
+    return key
+
+class AlgorithmHelpFormatter(argparse.HelpFormatter):
+    """Lists the registered algorithms only when help is printed, so parsing a command does not scan entry points."""
+
+    def _get_help_string(self, action):
+        if action.type is algorithm_number:
+            listing = ", ".join(f"{key}={algo['name']}" for key, algo in ALGORITHMS.items())
+            return f"{action.help}: {listing}".replace("%", "%%")
+        return super()._get_help_string(action)
+
+def build_parser():
+    """Builds the argument parser for the non-interactive commands."""
+    parser = argparse.ArgumentParser(description="Audio steganography CLI. Run without arguments for the interactive menu.")
+    parser.add_argument("--metrics", help="Write phase timings and counters to this file (Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument("--profile", help="Run the command under cProfile and write the statistics to this file")
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="N", help="Trace allocations and print the top N allocation sites")
+    parser.add_argument("--ecc", action="store_true",
+                        help="Protect encoded messages with an error-correcting code (decoding detects it automatically)")
+    parser.add_argument("--cache", nargs="?", const=OUTPUT_CACHE_DIR, metavar="DIR",
+                        help=f"Reuse encoded files of earlier runs with the same carrier and message (default directory: {OUTPUT_CACHE_DIR})")
+    parser.add_argument("--cache-max-bytes", type=int, default=OUTPUT_CACHE_MAX_BYTES,
+                        help=f"Evict least recently used cached files beyond this total size (default: {OUTPUT_CACHE_MAX_BYTES})")
+    parser.add_argument("--cache-link", action="store_true", help="Hard-link cached files into place instead of copying them")
+    parser.add_argument("--raw-format", metavar="CHANNELS,WIDTH,RATE",
+                        help="Layout of headerless PCM input, e.g. 2,2,44100 (sample width in bytes); .raw/.pcm files default to 2,2,44100")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command in ("encode-batch", "decode-batch"):
+        subparser = subparsers.add_parser(command, help=f"{command.split('-')[0].capitalize()} every file of a directory or manifest")
+        subparser.add_argument("source", help="Directory of audio files or a manifest listing one file path per line")
+        subparser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+        subparser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+        subparser.add_argument("-c", "--concurrency", type=int, default=None,
+                               help="Overlap file I/O with processing using asyncio, keeping this many files in flight")
+        if command == "encode-batch":
+            subparser.add_argument("-o", "--output-dir", required=True, help="Directory receiving the encoded files")
+            subparser.add_argument("-m", "--message", required=True, help="Secret message to encode into every file")
+
+    encode_parser = subparsers.add_parser("encode", help="Hide a message in WAV, RF64, AIFF or raw PCM audio, block by block")
+    encode_parser.add_argument("input", help="Carrier audio file, or - to read it from standard input")
+    encode_parser.add_argument("output", help="Encoded audio file to write (the extension picks the container), or - for standard output")
+    encode_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+    encode_parser.add_argument("-m", "--message", required=True, help="Secret message to encode")
+
+    decode_parser = subparsers.add_parser("decode", help="Print the message hidden in WAV, RF64, AIFF or raw PCM audio")
+    decode_parser.add_argument("input", help="Encoded audio file, or - to read it from standard input")
+    decode_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+
+    encode_file_parser = subparsers.add_parser("encode-file", help="Hide a binary file in an audio file")
+    encode_file_parser.add_argument("payload", help="File to hide, or - to read it from standard input")
+    encode_file_parser.add_argument("input", help="Carrier audio file")
+    encode_file_parser.add_argument("output", help="Encoded audio file to write")
+    encode_file_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+
+    decode_file_parser = subparsers.add_parser("decode-file", help="Recover a binary file hidden in an audio file")
+    decode_file_parser.add_argument("input", help="Encoded audio file")
+    decode_file_parser.add_argument("output", help="File to write the payload to, or - for standard output")
+    decode_file_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+
+    encode_mmap_parser = subparsers.add_parser("encode-mmap", help="Hide a message in a WAV or RF64 file by patching only the bytes that carry it")
+    encode_mmap_parser.add_argument("input", help="Carrier WAV or RF64 file")
+    encode_mmap_parser.add_argument("output", help="Encoded file to write; the input path itself embeds the message in place")
+    encode_mmap_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+    encode_mmap_parser.add_argument("-m", "--message", required=True, help="Secret message to encode")
+    encode_mmap_parser.add_argument("-w", "--workers", type=int, default=1, help="Number of threads embedding carrier ranges in parallel (default: 1)")
+
+    decode_mmap_parser = subparsers.add_parser("decode-mmap", help="Print the message hidden in a WAV or RF64 file, reading only the bytes that carry it")
+    decode_mmap_parser.add_argument("input", help="Encoded WAV or RF64 file")
+    decode_mmap_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+    decode_mmap_parser.add_argument("-w", "--workers", type=int, default=1, help="Number of threads extracting carrier ranges in parallel (default: 1)")
+
+    scan_parser = subparsers.add_parser("capacity-scan", help="Index the capacity of every audio file under a directory")
+    scan_parser.add_argument("root", help="Directory of audio files")
+    scan_parser.add_argument("--index", default=CAPACITY_INDEX_PATH, help=f"Capacity index file (default: {CAPACITY_INDEX_PATH})")
+
+    find_parser = subparsers.add_parser("capacity-find", help="Look up indexed carriers large enough for a message")
+    find_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+    payload = find_parser.add_mutually_exclusive_group(required=True)
+    payload.add_argument("-m", "--message", help="Secret message that has to fit")
+    payload.add_argument("-b", "--bits", type=int, help="Message size in bits that has to fit")
+    find_parser.add_argument("-n", "--limit", type=int, default=10, help="Maximum number of carriers listed")
+    find_parser.add_argument("--index", default=CAPACITY_INDEX_PATH, help=f"Capacity index file (default: {CAPACITY_INDEX_PATH})")
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="Measure decode accuracy and audio quality of every carrier as a regression gate")
+    evaluate_parser.add_argument("source", help="Directory of carrier audio files or a manifest listing one file path per line")
+    evaluate_parser.add_argument("-a", "--algorithm", type=algorithm_number, required=True, help="Algorithm to use")
+    evaluate_parser.add_argument("-e", "--encoded-dir", required=True, help="Directory of stego files mirroring the source layout")
+    evaluate_parser.add_argument("-m", "--message", required=True, help="Secret message the stego files should contain")
+    evaluate_parser.add_argument("--reencode", action="store_true", help="Encode the message into the stego files first")
+    evaluate_parser.add_argument("--max-ber", type=float, default=0.0, help="Highest bit error rate that passes (default: 0)")
+    evaluate_parser.add_argument("--min-snr", type=float, default=None, help="Lowest SNR in dB that passes")
+    evaluate_parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    evaluate_parser.add_argument("--json", help="Write the per-file metrics as JSON to this file")
+
+    scan_archive_parser = subparsers.add_parser("scan", help="Sweep a directory tree for embedded messages with every algorithm")
+    scan_archive_parser.add_argument("source", help="Directory of audio files or a manifest listing one file path per line")
+    scan_archive_parser.add_argument("-a", "--algorithm", type=algorithm_number, action="append",
+                                     help="Only try this algorithm; repeat for several (default: all)")
+    scan_archive_parser.add_argument("--unverified", action="store_true",
+                                     help="Also report payloads without a checksum, written before the checksum was added")
+    scan_archive_parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    scan_archive_parser.add_argument("--json", help="Write the hits as JSON to this file")
+
+    serve_parser = subparsers.add_parser("serve", help="Run a long-lived encode/decode service answering JSON requests")
+    serve_parser.add_argument("--host", default=SERVICE_HOST, help=f"Interface to listen on (default: {SERVICE_HOST})")
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT, help=f"TCP port to listen on (default: {SERVICE_PORT})")
+    serve_parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    serve_parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    serve_parser.add_argument("--max-pending", type=int, default=None, help="Jobs accepted at once before requests are refused with 503")
+    serve_parser.add_argument("--root", default=SERVICE_ROOT,
+                              help="Directory request paths are relative to; paths leading out of it are refused (default: the current directory)")
+
+    for subparser in subparsers.choices.values():
+        subparser.formatter_class = AlgorithmHelpFormatter
+    return parser
+
+def run_command(argv):
+    """Runs a non-interactive command and returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.ecc and args.command in ("encode-file", "decode-file"):
+        parser.error(f"--ecc protects messages only and cannot be used with {args.command}")
+    # Imported only when used so the other commands start without loading NumPy;
+    # the settings go through the environment so worker processes inherit them
+    if args.raw_format:
+        os.environ[RAW_FORMAT_ENV_VAR] = args.raw_format
+    if args.ecc:
+        from algorithms.ecc import ECC_ENV_VAR
+        os.environ[ECC_ENV_VAR] = "1"
+    if args.cache:
+        from cli import output_cache
+        os.environ[output_cache.CACHE_DIR_ENV_VAR] = args.cache
+        os.environ[output_cache.CACHE_MAX_BYTES_ENV_VAR] = str(args.cache_max_bytes)
+        if args.cache_link:
+            os.environ[output_cache.CACHE_LINK_ENV_VAR] = "1"
+    exit_code = run_profiled(lambda: execute(args), args.profile, args.tracemalloc)
+    if args.metrics:
+        METRICS.write(args.metrics)
+    return exit_code
+
+def execute(args):
+    """Executes a parsed command and returns the process exit code."""
+    if args.command == "encode-batch" and args.concurrency:
+        failed = async_batch.encode_batch(args.algorithm, args.source, args.output_dir, args.message, args.concurrency)
+    elif args.command == "encode-batch":
+        failed = encode_batch(args.algorithm, args.source, args.output_dir, args.message, workers=args.workers)
+    elif args.command == "decode-batch" and args.concurrency:
+        failed = async_batch.decode_batch(args.algorithm, args.source, args.concurrency)
+    elif args.command == "decode-batch":
+        failed = decode_batch(args.algorithm, args.source, workers=args.workers)
+    elif args.command == "encode":
+        # The streaming variants read and write front to back, so pipes work and memory stays bounded
+        source = sys.stdin.buffer if args.input == "-" else args.input
+        output = sys.stdout.buffer if args.output == "-" else args.output
+        failed = ALGORITHMS[args.algorithm]['encode_streaming'](source, output, args.message) is None
+    elif args.command == "decode":
+        source = sys.stdin.buffer if args.input == "-" else args.input
+        message = ALGORITHMS[args.algorithm]['decode_streaming'](source)
+        if message is not None:
+            print(message)
+        failed = message is None
+    elif args.command in ("encode-file", "decode-file") and args.command.replace("-", "_") not in ALGORITHMS[args.algorithm]:
+        print(f"{ALGORITHMS[args.algorithm]['name']} does not support file payloads.", file=sys.stderr)
+        failed = True
+    elif args.command == "encode-file":
+        payload = sys.stdin.buffer if args.payload == "-" else args.payload
+        failed = ALGORITHMS[args.algorithm]['encode_file'](args.input, args.output, payload) is None
+    elif args.command == "decode-file":
+        output = sys.stdout.buffer if args.output == "-" else args.output
+        failed = ALGORITHMS[args.algorithm]['decode_file'](args.input, output) is None
+    elif args.command in ("encode-mmap", "decode-mmap") and args.command.replace("-", "_") not in ALGORITHMS[args.algorithm]:
+        print(f"{ALGORITHMS[args.algorithm]['name']} does not support memory-mapped files.", file=sys.stderr)
+        failed = True
+    elif args.command == "encode-mmap":
+        failed = ALGORITHMS[args.algorithm]['encode_mmap'](args.input, args.output, args.message, workers=args.workers) is None
+    elif args.command == "decode-mmap":
+        message = ALGORITHMS[args.algorithm]['decode_mmap'](args.input, workers=args.workers)
+        if message is not None:
+            print(message)
+        failed = message is None
+    elif args.command == "evaluate":
+        from cli.accuracy import evaluate_batch
+        failed = evaluate_batch(args.algorithm, args.source, args.encoded_dir, args.message, args.reencode,
+                                args.max_ber, args.min_snr, workers=args.workers, json_path=args.json)
+    elif args.command == "scan":
+        from cli.scanner import scan_archive
+        failed = not scan_archive(args.source, args.algorithm, args.unverified, workers=args.workers, json_path=args.json)
+    elif args.command == "serve":
+        # Imported here so the other commands do not load the HTTP server
+        from cli.service import serve
+        serve(args.host, args.port, args.socket, workers=args.workers, max_pending=args.max_pending, root=args.root)
+        failed = False
+    elif args.command == "capacity-scan":
+        refreshed, unchanged, failed = scan(args.root, args.index)
+        print(f"{refreshed} files indexed, {unchanged} unchanged, {failed} unreadable")
+    else:
+        # Imported here so the other commands start without loading NumPy
+        from algorithms.bit_packing import message_bit_length
+        message_bits = args.bits if args.message is None else message_bit_length(args.message)
+        carriers = find_carriers(args.index, args.algorithm, message_bits, limit=args.limit)
+        for path, capacity_bits in carriers:
+            print(f"{capacity_bits:>12} bits  {path}")
+        failed = not carriers
+    return 1 if failed else 0
+
 def main():
     """Main function to run the CLI program."""
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
+
     while True:
         display_menu(["Encode a message", "Decode a message", "Calculate accuracy", "Exit"], "Select an option")
         choice = get_user_choice(4)
@@ -0,0 +1,225 @@
+"""Content-addressed cache of encoded files, so re-encoding the same carrier and message costs a hash instead of an encode."""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from utils.logging_util import setup_logger
+from utils.metrics import METRICS
+from cli.config import OUTPUT_CACHE_MAX_BYTES
+
+logger = setup_logger(__name__)
+
+# The cache is enabled by pointing this environment variable at its directory, so worker processes inherit it
+CACHE_DIR_ENV_VAR = "STEGANOGRAPHY_OUTPUT_CACHE"
+CACHE_MAX_BYTES_ENV_VAR = "STEGANOGRAPHY_OUTPUT_CACHE_MAX_BYTES"
+# Set to 1 to hard-link cached files into place instead of copying them
+CACHE_LINK_ENV_VAR = "STEGANOGRAPHY_OUTPUT_CACHE_LINK"
+
+# Bump when the encoded output of an unchanged algorithm, carrier and message changes
+CACHE_FORMAT = b"1"
+
+HASH_CHUNK_BYTES = 1 << 20
+
+# Carrier digests of this process, keyed by path and the stat fields that change when the file does
+carrier_digests = {}
+
+def cache_dir():
+    """Returns the cache directory, or None if the cache is disabled."""
+    return os.environ.get(CACHE_DIR_ENV_VAR) or None
+
+def carrier_digest(file_path):
+    """
+    Returns the BLAKE2b digest of a carrier file, hashed in chunks and remembered until the file changes.
+
+    :param file_path: Path to the carrier audio file
+    :return: Hex digest of the file contents
+    """
+    stat = os.stat(file_path)
+    stamp = (os.path.abspath(file_path), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if stamp not in carrier_digests:
+        digest = hashlib.blake2b()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        carrier_digests[stamp] = digest.hexdigest()
+    return carrier_digests[stamp]
+
+def cache_key(algorithm, input_file, secret_message, output_file=None):
+    """
+    Returns the cache key of an encode: the carrier contents, the algorithm, the message and the
+    settings that change the output (ECC framing, the scatter key, which is only hashed, and the
+    container picked by the output file extension).
+
+    :param algorithm: The algorithm entry from ALGORITHMS
+    :param input_file: Path to the carrier audio file
+    :param secret_message: The message to be encoded
+    :param output_file: Path to the output encoded audio file (None keeps the carrier's container)
+    :return: Hex key, or None if the cache is disabled
+    """
+    if cache_dir() is None:
+        return None
+    # Imported here so importing the cache does not load NumPy
+    from algorithms.audio_io import EXTENSION_CONTAINERS
+    from algorithms.ecc import use_ecc
+    from algorithms.scatter_lsb_steganography import KEY_ENV_VAR
+    container = EXTENSION_CONTAINERS.get(os.path.splitext(output_file)[1].lower(), "") if output_file else ""
+    digest = hashlib.blake2b(CACHE_FORMAT, digest_size=20)
+    for part in (algorithm['module'], carrier_digest(input_file), secret_message,
+                 str(use_ecc()), os.environ.get(KEY_ENV_VAR, ""), container):
+        encoded = part.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'big') + encoded)
+    return digest.hexdigest()
+
+def entry_paths(key):
+    """Returns the paths of a cache entry's audio file and its metadata."""
+    return os.path.join(cache_dir(), f"{key}.wav"), os.path.join(cache_dir(), f"{key}.json")
+
+def release(output_file):
+    """
+    Unlinks an output file that shares its storage with a cache entry, so writing the file does not change the entry.
+
+    :param output_file: Path about to be written
+    """
+    try:
+        if os.stat(output_file).st_nlink > 1:
+            os.unlink(output_file)
+    except FileNotFoundError:
+        pass
+
+def place(source, destination):
+    """Atomically puts a copy (or, if enabled and possible, a hard link) of ``source`` at ``destination``."""
+    temporary = f"{destination}.{os.getpid()}.tmp"
+    try:
+        if os.environ.get(CACHE_LINK_ENV_VAR) == "1":
+            try:
+                os.link(source, temporary)
+            except OSError:  # Different file system, or links not supported
+                shutil.copyfile(source, temporary)
+        else:
+            shutil.copyfile(source, temporary)
+        os.replace(temporary, destination)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+
+def restore(key, output_file):
+    """
+    Puts the cached output of an encode at ``output_file``.
+
+    Entries whose size or mtime no longer match the values recorded when they were stored were
+    changed through a hard link and are dropped.
+
+    :param key: Key from cache_key, or None
+    :param output_file: Path to the output encoded audio file
+    :return: True on a cache hit, False otherwise
+    """
+    if key is None:
+        return False
+    audio_path, meta_path = entry_paths(key)
+    try:
+        with open(meta_path) as f:
+            recorded = json.load(f)
+        stat = os.stat(audio_path)
+    except (OSError, ValueError):
+        METRICS.add("output_cache", "misses")
+        return False
+    if (stat.st_size, stat.st_mtime_ns) != (recorded["size"], recorded["mtime_ns"]):
+        logger.warning(f"Dropping modified cache entry {key}")
+        remove_entry(key)
+        METRICS.add("output_cache", "misses")
+        return False
+
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    release(output_file)
+    place(audio_path, output_file)
+    # The access time orders entries for eviction; the mtime is kept so the entry still validates
+    os.utime(audio_path, ns=(time.time_ns(), stat.st_mtime_ns))
+    METRICS.add("output_cache", "hits")
+    logger.info(f"Reused cached output for {output_file}")
+    return True
+
+def store(key, output_file):
+    """
+    Adds a freshly encoded output to the cache and evicts the least recently used entries beyond the size limit.
+
+    :param key: Key from cache_key, or None
+    :param output_file: Path to the output encoded audio file
+    """
+    if key is None:
+        return
+    audio_path, meta_path = entry_paths(key)
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        place(output_file, audio_path)
+        stat = os.stat(audio_path)
+        temporary = f"{meta_path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, f)
+        os.replace(temporary, meta_path)
+        METRICS.add("output_cache", "stored_bytes", stat.st_size)
+        evict(int(os.environ.get(CACHE_MAX_BYTES_ENV_VAR, OUTPUT_CACHE_MAX_BYTES)))
+    except OSError as e:
+        logger.error(f"Error caching {output_file}: {e}")
+
+def remove_entry(key):
+    """Deletes a cache entry, ignoring parts that are already gone."""
+    for path in entry_paths(key):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def evict(max_bytes):
+    """
+    Deletes the least recently used entries until the cache holds at most ``max_bytes``.
+
+    :param max_bytes: Size limit of the cached audio files
+    :return: Number of entries deleted
+    """
+    entries = []
+    with os.scandir(cache_dir()) as scan:
+        for entry in scan:
+            if entry.name.endswith(".wav"):
+                stat = entry.stat()
+                entries.append((stat.st_atime_ns, stat.st_size, entry.name[:-len(".wav")]))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        remove_entry(key)
+        total -= size
+        evicted += 1
+    if evicted:
+        METRICS.add("output_cache", "evictions", evicted)
+        logger.info(f"Evicted {evicted} cache entries")
+    return evicted
+
+def cached_encode(algorithm, encode, input_file, output_file, secret_message):
+    """
+    Runs an encode function unless the cache already holds its output.
+
+    :param algorithm: The algorithm entry from ALGORITHMS
+    :param encode: Encode function of the algorithm taking (input, output, message)
+    :param input_file: Path to the input audio file
+    :param output_file: Path to the output encoded audio file
+    :param secret_message: The message to be encoded
+    :return: The output file path, or None if encoding failed
+    """
+    if os.path.abspath(input_file) == os.path.abspath(output_file):  # In-place encodes have nothing to reuse
+        return encode(input_file, output_file, secret_message)
+    try:
+        key = cache_key(algorithm, input_file, secret_message, output_file=output_file)
+    except OSError as e:  # Left to the encode function to report
+        logger.warning(f"Not caching {input_file}: {e}")
+        key = None
+    if restore(key, output_file):
+        return output_file
+    release(output_file)
+    result = encode(input_file, output_file, secret_message)
+    if result is not None:
+        store(key, output_file)
+    return result
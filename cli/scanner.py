@@ -0,0 +1,91 @@
+import json
+import time
+
+from utils.logging_util import setup_logger
+from algorithms.audio_io import CONTAINER_RF64, CONTAINER_WAV, open_audio
+from cli.config import ALGORITHMS
+from cli.batch import collect_files, run_jobs
+
+logger = setup_logger(__name__)
+
+# Characters of a found message shown in the scan report
+PREVIEW_CHARS = 60
+
+def scan_job(input_file, algo_choices, unverified):
+    """
+    Looks for an embedded message in one file with every given algorithm, in a worker process.
+
+    Each algorithm first reads only the payload header; files whose header is malformed or
+    describes more bits than the file can hold are rejected without reading the payload.
+
+    :param input_file: Path to the audio file
+    :param algo_choices: Keys of the algorithms in ALGORITHMS to try
+    :param unverified: Also decode payloads without a checksum, which may turn random bits into a message
+    :return: Tuple of (input file, list of hit dictionaries or None if the file cannot be read, elapsed seconds)
+    """
+    start = time.perf_counter()
+    try:
+        with open_audio(input_file, 'rb') as audio:
+            # Other containers cannot be memory-mapped in WAV layout and are decoded from their frames instead
+            mappable = audio.getcontainer() in (CONTAINER_WAV, CONTAINER_RF64)
+    except Exception as e:  # Reported as failed, so an unreadable file is never counted as clean
+        logger.warning(f"Cannot scan {input_file}: {e}")
+        return input_file, None, time.perf_counter() - start
+
+    hits = []
+    for algo_choice in algo_choices:
+        algorithm = ALGORITHMS[algo_choice]
+        if 'probe' not in algorithm:
+            continue
+        layout = algorithm['probe'](input_file)
+        if layout is None:
+            continue
+        payload_bits, checked = layout
+        if not checked and not unverified:
+            continue
+        decode = algorithm['decode_mmap'] if mappable and 'decode_mmap' in algorithm else algorithm['decode']
+        message = decode(input_file)
+        if message is not None:
+            hits.append({"algorithm": algorithm['name'], "payload_bits": payload_bits, "verified": checked, "message": message})
+    return input_file, hits, time.perf_counter() - start
+
+def scan_archive(source, algo_choices=None, unverified=False, workers=None, json_path=None):
+    """
+    Sweeps every file of a directory tree or manifest for embedded messages.
+
+    :param source: Directory or manifest file listing the audio files
+    :param algo_choices: Keys of the algorithms in ALGORITHMS to try (None tries all of them)
+    :param unverified: Also report payloads without a checksum
+    :param workers: Number of worker processes (None uses the CPU count)
+    :param json_path: Write the hits as JSON to this file
+    :return: Number of files holding a message
+    """
+    files = collect_files(source)
+    algo_choices = sorted(ALGORITHMS) if algo_choices is None else algo_choices
+    logger.info(f"Scanning {len(files)} files with {len(algo_choices)} algorithms")
+
+    start = time.perf_counter()
+    job_args = [(path, algo_choices, unverified) for path, _ in files]
+    results = sorted(run_jobs(scan_job, job_args, workers, "Scanning files", input_index=0), key=lambda result: result[0])
+    wall_time = max(time.perf_counter() - start, 1e-9)
+
+    found = failed = 0
+    for input_file, hits, elapsed in results:
+        if hits is None:
+            failed += 1
+            print(f"FAILED     {input_file}: could not be scanned ({elapsed:.3f}s)")
+            continue
+        found += bool(hits)
+        for hit in hits:
+            preview = hit["message"][:PREVIEW_CHARS]
+            print(f"{'HIT       ' if hit['verified'] else 'UNVERIFIED'} {input_file} [{hit['algorithm']}]: "
+                  f"{len(hit['message'])} characters {preview!r} ({elapsed:.3f}s)")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump([{"file": input_file, **hit} for input_file, hits, _ in results for hit in hits or ()], f, indent=2)
+
+    print(f"\n{len(results)} files scanned, {found} holding a message, {failed} failed in {wall_time:.2f}s "
+          f"({len(results) / wall_time:.1f} files/s)")
+    logger.info(f"Scan finished: {len(results)} files, {found} holding a message, {failed} failed")
+    return found
@@ -0,0 +1,218 @@
+import json
+import os
+import signal
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.logging_util import setup_logger
+from utils.metrics import METRICS, run_with_metrics
+from cli.config import ALGORITHMS, SERVICE_HOST, SERVICE_PORT, SERVICE_QUEUE_PER_WORKER, SERVICE_ROOT
+from cli.batch import encode_job, decode_job
+
+logger = setup_logger(__name__)
+
+def preload_algorithms():
+    """Imports every registered algorithm module so the first job does not pay for it."""
+    for algorithm in ALGORITHMS.values():
+        algorithm.module
+
+def confine_path(root, path):
+    """
+    Resolves a request path below the service root.
+
+    :param root: Absolute, symlink-free path of the service root
+    :param path: Path from the request, relative to the root
+    :return: The absolute path
+    :raises ValueError: If the path is absolute, has a ``..`` segment or leads out of the root through a symlink
+    """
+    if os.path.isabs(path) or ".." in path.replace(os.sep, "/").split("/"):
+        raise ValueError(f"{path!r} must be relative to the service root and must not contain '..'")
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{path!r} leads out of the service root")
+    return resolved
+
+class JobPool:
+    """
+    Process pool that accepts at most a fixed number of outstanding jobs.
+
+    Submitting beyond the limit fails immediately instead of queueing without bound, so a
+    busy service pushes back on its clients rather than growing its memory.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=preload_algorithms)
+        self.max_pending = max_pending or self.workers * SERVICE_QUEUE_PER_WORKER
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Number of jobs submitted and not yet finished."""
+        return self._pending
+
+    def run(self, job, *args):
+        """
+        Runs a job on the pool and waits for its result.
+
+        :param job: Top-level worker function
+        :param args: Arguments passed to the job
+        :return: The job's return value, or None if the pool is full
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            result, metrics = self.executor.submit(run_with_metrics, job, *args).result()
+            METRICS.merge(metrics)
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def shutdown(self):
+        """Waits for running jobs and stops the worker processes."""
+        self.executor.shutdown(wait=True)
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Answers the JSON endpoints ``GET /health``, ``POST /encode`` and ``POST /decode``, and ``GET /metrics`` for Prometheus."""
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            payload = METRICS.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        if self.path != "/health":
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        self.send_json(200, {
+            "algorithms": {key: algorithm["name"] for key, algorithm in ALGORITHMS.items()},
+            "pending": self.server.pool.pending,
+            "max_pending": self.server.pool.max_pending,
+        })
+
+    def do_POST(self):
+        if self.path not in ("/encode", "/decode"):
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        # Browsers send cross-origin text/plain and form posts without a preflight, but never JSON
+        if self.headers.get_content_type() != "application/json":
+            self.send_json(415, {"error": "Requests must be sent as application/json"})
+            return
+        try:
+            job, args = self.parse_job()
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        # Errors raised by the job itself are the job's failure, not a malformed request
+        try:
+            outcome = self.server.pool.run(job, *args)
+        except OSError as e:
+            logger.error(f"Job failed for {args[1]}: {e}")
+            self.send_json(422, {"input": args[1], "ok": False, "error": str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Job crashed for {args[1]}: {e!r}")
+            self.send_json(500, {"input": args[1], "ok": False, "error": f"Internal error: {e!r}"})
+            return
+
+        if outcome is None:
+            self.send_json(503, {"error": "Too many pending jobs, retry later"}, {"Retry-After": "1"})
+            return
+        input_file, result, elapsed = outcome
+        body = {"input": input_file, "ok": result is not None, "elapsed_ms": elapsed * 1000}
+        body["output" if self.path == "/encode" else "message"] = result
+        self.send_json(200 if result is not None else 422, body)
+
+    def parse_job(self):
+        """
+        Validates the JSON body of an encode or decode request.
+
+        :return: Tuple of (job function, job arguments)
+        """
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if not isinstance(request, dict):
+            raise TypeError("the body must be a JSON object")
+        algo_choice = int(request["algorithm"])
+        if algo_choice not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algo_choice}")
+        job, paths, texts = (encode_job, ("input", "output"), ("message",)) if self.path == "/encode" else (decode_job, ("input",), ())
+        for field in paths + texts:
+            if not isinstance(request[field], str):
+                raise TypeError(f"{field} must be a string")
+        return job, (algo_choice, *(confine_path(self.server.root, request[field]) for field in paths), *(request[field] for field in texts))
+
+    def send_json(self, status, body, headers=None):
+        """Writes a JSON response."""
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server listening on a Unix domain socket."""
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None, workers=None, max_pending=None, root=SERVICE_ROOT):
+    """
+    Runs the encode/decode service until interrupted.
+
+    :param host: Interface the HTTP endpoint listens on
+    :param port: TCP port of the HTTP endpoint
+    :param socket_path: Listen on this Unix socket instead of TCP
+    :param workers: Number of worker processes (None uses the CPU count)
+    :param max_pending: Jobs accepted before answering 503 (defaults to SERVICE_QUEUE_PER_WORKER per worker)
+    :param root: Directory the input and output paths of requests are confined to
+    """
+    preload_algorithms()
+    pool = JobPool(workers, max_pending)
+    if socket_path:
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        address = f"http://{host}:{server.server_address[1]}"
+    server.pool = pool
+    server.root = os.path.realpath(root)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)  # Shut down cleanly under process supervisors too
+
+    logger.info(f"Service listening on {address} with {pool.workers} workers, {pool.max_pending} pending jobs at most, serving files below {server.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Service stopping.")
+    finally:
+        server.server_close()
+        pool.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,25 @@
+import wave
+
+import numpy as np
+import pytest
+
+def write_wav(path, nframes=20000, nchannels=2, sampwidth=2, framerate=44100, seed=0):
+    """
+    Writes a WAV file of random PCM samples with the standard library.
+
+    :return: The frame bytes that were written
+    """
+    frames = np.random.default_rng(seed).integers(0, 256, nframes * nchannels * sampwidth, dtype=np.uint8).tobytes()
+    with wave.open(str(path), 'wb') as audio:
+        audio.setnchannels(nchannels)
+        audio.setsampwidth(sampwidth)
+        audio.setframerate(framerate)
+        audio.writeframes(frames)
+    return frames
+
+@pytest.fixture
+def carrier(tmp_path):
+    """Path to a 16-bit stereo WAV carrier."""
+    path = tmp_path / "carrier.wav"
+    write_wav(path)
+    return str(path)
@@ -0,0 +1,57 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from cli.accuracy import audio_metrics, evaluate_batch, message_metrics, samples_from_bytes
+from cli.config import ALGORITHMS
+from tests.conftest import write_wav
+
+def test_message_metrics():
+    assert message_metrics("secret", "secret") == {"bit_error_rate": 0.0, "char_accuracy": 100.0}
+    # "t" (0x74) and "u" (0x75) differ in one of 48 bits
+    assert message_metrics("secret", "secreu") == {"bit_error_rate": 1 / 48, "char_accuracy": pytest.approx(500 / 6)}
+    # Missing bits and characters count as errors
+    assert message_metrics("secret", None) == {"bit_error_rate": 1.0, "char_accuracy": 0.0}
+    assert message_metrics("secret", "sec")["bit_error_rate"] == 0.5
+
+@pytest.mark.parametrize("sampwidth, data, expected", [
+    (1, [0, 128, 255], [-128, 0, 127]),
+    (2, [0x01, 0x80, 0xff, 0x7f], [-32767, 32767]),
+    (3, [0xff, 0xff, 0xff, 0x00, 0x00, 0x80], [-1, -(1 << 23)]),
+    (4, [0x02, 0x00, 0x00, 0x80], [-(1 << 31) + 2]),
+])
+def test_samples_from_bytes(sampwidth, data, expected):
+    assert samples_from_bytes(np.array(data, dtype=np.uint8), sampwidth).tolist() == expected
+
+def test_audio_metrics(carrier, tmp_path):
+    untouched = audio_metrics(carrier, carrier)
+    assert untouched["snr_db"] == math.inf and untouched["changed_samples"] == 0.0
+
+    output = str(tmp_path / "encoded.wav")
+    ALGORITHMS[4]['encode'](carrier, output, "quality")
+    # Small blocks exercise the block-wise accumulation
+    metrics = audio_metrics(carrier, output, block_frames=999)
+    assert metrics == audio_metrics(carrier, output)
+    assert metrics["max_deviation"] == 1
+    assert 0 < metrics["changed_samples"] < 0.01
+    assert metrics["snr_db"] > 60
+
+def test_mismatched_files_are_rejected(carrier, tmp_path):
+    write_wav(tmp_path / "mono.wav", nchannels=1)
+    with pytest.raises(ValueError, match="parameters"):
+        audio_metrics(carrier, str(tmp_path / "mono.wav"))
+
+def test_evaluate_batch_gates_on_ber_and_snr(tmp_path):
+    (tmp_path / "library").mkdir()
+    write_wav(tmp_path / "library" / "one.wav")
+    write_wav(tmp_path / "library" / "two.wav", seed=1)
+    encoded, report = str(tmp_path / "encoded"), str(tmp_path / "report.json")
+
+    assert evaluate_batch(1, str(tmp_path / "library"), encoded, "gate", reencode=True, min_snr=60, workers=2, json_path=report) == 0
+    with open(report) as f:
+        rows = json.load(f)
+    assert [row["bit_error_rate"] for row in rows] == [0.0, 0.0]
+    assert evaluate_batch(1, str(tmp_path / "library"), encoded, "other message", workers=2) == 2
+    assert evaluate_batch(1, str(tmp_path / "library"), encoded, "gate", min_snr=200, workers=2) == 2
@@ -0,0 +1,208 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from algorithms.audio_io import (
+    CONTAINER_AIFF,
+    CONTAINER_RAW,
+    CONTAINER_RF64,
+    CONTAINER_WAV,
+    RAW_FORMAT_ENV_VAR,
+    AudioParams,
+    open_audio,
+    write_extended,
+)
+from algorithms.wav_mmap import find_data_chunk
+from cli import async_batch
+from cli.config import ALGORITHMS
+from tests.conftest import write_wav
+
+class Pipe(io.RawIOBase):
+    """Unseekable byte stream, like standard input or output."""
+
+    def __init__(self, data=b''):
+        self.buffer = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def readinto(self, target):
+        data = self.buffer.read(len(target))
+        target[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+def read_all(path_or_file):
+    """Returns the params and every frame of an audio source."""
+    with open_audio(path_or_file, 'rb') as audio:
+        params = audio.getparams()
+        frames = b''.join(iter(lambda: audio.readframes(4096), b''))
+    return params, frames
+
+def convert(source, destination):
+    """Copies the frames of one audio file into another, whose extension picks the container."""
+    with open_audio(source, 'rb') as audio, open_audio(destination, 'wb') as output:
+        output.setparams(audio.getparams())
+        output.writeframes(audio.readframes(audio.getnframes()))
+
+def swapped(frames, sampwidth):
+    """Reverses the byte order of every sample."""
+    return np.frombuffer(frames, dtype=np.uint8).reshape(-1, sampwidth)[:, ::-1].tobytes()
+
+def aifc_file(frames, compression, nchannels=2, sampwidth=2, framerate=44100):
+    """Builds an AIFF-C file by hand; ``frames`` are stored as given."""
+    nframes = len(frames) // (nchannels * sampwidth)
+    common = struct.pack('>hIh', nchannels, nframes, sampwidth * 8) + write_extended(framerate) + compression + b'\x00\x00'
+    sound = struct.pack('>II', 0, 0) + frames
+    chunks = struct.pack('>4sI', b'COMM', len(common)) + common + struct.pack('>4sI', b'SSND', len(sound)) + sound
+    return struct.pack('>4sI4s', b'FORM', 4 + len(chunks), b'AIFC') + chunks
+
+def test_wav_matches_the_wave_module(carrier, tmp_path):
+    params, frames = read_all(carrier)
+    with wave.open(carrier, 'rb') as reference:
+        assert params[:4] == reference.getparams()[:4]
+        assert frames == reference.readframes(reference.getnframes())
+    assert params.container == CONTAINER_WAV
+
+    copy = tmp_path / "copy.wav"
+    convert(carrier, copy)
+    assert copy.read_bytes() == open(carrier, 'rb').read()
+
+@pytest.mark.parametrize("sampwidth", [1, 2, 3])
+def test_aiff_round_trip(tmp_path, sampwidth):
+    frames = write_wav(tmp_path / "source.wav", nframes=1001, nchannels=2, sampwidth=sampwidth)
+    convert(tmp_path / "source.wav", tmp_path / "copy.aiff")
+
+    data = (tmp_path / "copy.aiff").read_bytes()
+    assert data[:4] == b'FORM' and data[8:12] == b'AIFF'
+    sound = data.index(b'SSND') + 16
+    stored = data[sound:sound + len(frames)]
+    # AIFF stores big-endian samples, and 8-bit samples signed instead of unsigned
+    assert stored == (bytes(byte ^ 0x80 for byte in frames) if sampwidth == 1 else swapped(frames, sampwidth))
+
+    params, decoded = read_all(tmp_path / "copy.aiff")
+    assert params[:4] == (2, sampwidth, 44100, 1001)
+    assert params.container == CONTAINER_AIFF
+    assert decoded == frames
+
+@pytest.mark.parametrize("compression, little_endian", [(b'NONE', False), (b'twos', False), (b'sowt', True)])
+def test_aifc_compression_types(tmp_path, compression, little_endian):
+    frames = write_wav(tmp_path / "source.wav", nframes=500)
+    stored = frames if little_endian else swapped(frames, 2)
+    (tmp_path / "source.aifc").write_bytes(aifc_file(stored, compression))
+    params, decoded = read_all(tmp_path / "source.aifc")
+    assert params[:4] == (2, 2, 44100, 500)
+    assert decoded == frames
+
+def test_compressed_aifc_is_rejected(tmp_path):
+    (tmp_path / "source.aifc").write_bytes(aifc_file(b'\x00' * 400, b'ulaw'))
+    with pytest.raises(ValueError, match="compression"):
+        open_audio(str(tmp_path / "source.aifc"), 'rb')
+
+def test_rf64_round_trip(carrier, tmp_path):
+    _, frames = read_all(carrier)
+    convert(carrier, tmp_path / "copy.rf64")
+
+    data = (tmp_path / "copy.rf64").read_bytes()
+    assert data[:4] == b'RF64' and data[12:16] == b'ds64'
+    assert find_data_chunk(data)[1] == len(frames)
+
+    params, decoded = read_all(tmp_path / "copy.rf64")
+    assert params.container == CONTAINER_RF64
+    assert decoded == frames
+
+def test_raw_pcm(tmp_path, monkeypatch):
+    frames = write_wav(tmp_path / "source.wav", nframes=600, nchannels=1)
+    (tmp_path / "source.raw").write_bytes(frames)
+    params, decoded = read_all(tmp_path / "source.raw")
+    assert params[:4] == (2, 2, 44100, 300)  # The default layout is 16-bit stereo
+    assert params.container == CONTAINER_RAW
+    assert decoded == frames
+
+    monkeypatch.setenv(RAW_FORMAT_ENV_VAR, "1,2,8000")
+    params, _ = read_all(tmp_path / "source.raw")
+    assert params[:4] == (1, 2, 8000, 600)
+
+    monkeypatch.setenv(RAW_FORMAT_ENV_VAR, "stereo")
+    with pytest.raises(ValueError, match=RAW_FORMAT_ENV_VAR):
+        open_audio(str(tmp_path / "source.raw"), 'rb')
+
+def test_wav_from_an_unseekable_stream(carrier):
+    _, frames = read_all(carrier)
+    params, decoded = read_all(io.BufferedReader(Pipe(open(carrier, 'rb').read())))
+    assert params.nframes == len(frames) // 4
+    assert decoded == frames
+
+def test_stream_of_unknown_length(carrier):
+    _, frames = read_all(carrier)
+    pipe = Pipe()
+    with open_audio(pipe, 'wb') as output:
+        output.setparams(AudioParams(2, 2, 44100, None, 'NONE', 'not compressed', CONTAINER_WAV))
+        output.writeframes(frames)
+    written = pipe.buffer.getvalue()
+    assert struct.unpack('<I', written[40:44])[0] == 0xFFFFFFFF
+
+    # A stream is read to its end; a file of the same bytes takes its length from the file size
+    params, decoded = read_all(io.BufferedReader(Pipe(written)))
+    assert params.nframes is None
+    assert decoded == frames
+    params, decoded = read_all(io.BytesIO(written))
+    assert params.nframes == len(frames) // 4
+    assert decoded == frames
+
+def test_header_is_corrected_when_fewer_frames_are_written(carrier, tmp_path):
+    _, frames = read_all(carrier)
+    with open_audio(carrier, 'rb') as audio, open_audio(str(tmp_path / "short.aiff"), 'wb') as output:
+        output.setparams(audio.getparams())
+        output.writeframes(frames[:4000])
+    params, decoded = read_all(tmp_path / "short.aiff")
+    assert params.nframes == 1000
+    assert decoded == frames[:4000]
+
+@pytest.mark.parametrize("data, match", [
+    (b'not audio at all', "Unrecognized"),
+    (b'RIFF\x00\x00\x00\x00WAVEfmt ', "truncated"),
+    (b'RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00' + struct.pack('<HHIIHH', 3, 1, 8000, 32000, 4, 32), "PCM"),
+])
+def test_malformed_files_are_rejected(tmp_path, data, match):
+    (tmp_path / "bad.wav").write_bytes(data)
+    with pytest.raises(ValueError, match=match):
+        open_audio(str(tmp_path / "bad.wav"), 'rb')
+
+@pytest.mark.parametrize("extension", [".aiff", ".rf64"])
+@pytest.mark.parametrize("algo_choice", sorted(ALGORITHMS))
+def test_algorithms_across_containers(carrier, tmp_path, extension, algo_choice):
+    algorithm = ALGORITHMS[algo_choice]
+    output = str(tmp_path / f"encoded{extension}")
+    assert algorithm['encode'](carrier, output, "container ✓") == output
+    assert algorithm['decode'](output) == "container ✓"
+    assert algorithm['decode_streaming'](output) == "container ✓"
+    assert algorithm['probe'](output) is not None
+    if extension == ".rf64":
+        assert algorithm['decode_mmap'](output) == "container ✓"
+
+@pytest.mark.parametrize("algo_choice", sorted(ALGORITHMS))
+def test_streaming_through_pipes(carrier, algo_choice):
+    algorithm = ALGORITHMS[algo_choice]
+    source, sink = io.BufferedReader(Pipe(open(carrier, 'rb').read())), Pipe()
+    assert algorithm['encode_streaming'](source, sink, "piped") is sink
+    assert algorithm['decode_streaming'](io.BufferedReader(Pipe(sink.buffer.getvalue()))) == "piped"
+
+def test_async_batch_keeps_the_container(carrier, tmp_path):
+    (tmp_path / "library").mkdir()
+    convert(carrier, str(tmp_path / "library" / "take.aiff"))
+    assert async_batch.encode_batch(1, str(tmp_path / "library"), str(tmp_path / "encoded"), "async ✓") == 0
+    output = tmp_path / "encoded" / "take.aiff"
+    assert output.read_bytes()[8:12] == b"AIFF"
+    assert ALGORITHMS[1]['decode'](str(output)) == "async ✓"
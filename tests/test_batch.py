@@ -0,0 +1,39 @@
+import os
+
+from cli.batch import collect_files, decode_batch, encode_batch
+from tests.conftest import write_wav
+
+def make_library(root):
+    """Writes two carriers with the same name in different directories, a non-audio file and a corrupt carrier."""
+    for directory in ("a", "b"):
+        (root / directory).mkdir(parents=True)
+        write_wav(root / directory / "take.wav", nframes=2000)
+    (root / "notes.txt").write_text("not audio")
+    (root / "broken.wav").write_bytes(b"not a wav file")
+
+def test_directory_layout_is_mirrored(tmp_path):
+    make_library(tmp_path / "library")
+    files = collect_files(str(tmp_path / "library"))
+    assert [relative for _, relative in files] == ["a/take.wav", "b/take.wav", "broken.wav"]
+
+def test_manifest_entries_keep_their_directories(tmp_path):
+    make_library(tmp_path / "library")
+    manifest = tmp_path / "manifest.txt"
+    entries = [tmp_path / "library" / "a" / "take.wav", tmp_path / "library" / "b" / "take.wav"]
+    manifest.write_text("# carriers\n" + "".join(f"{entry}\n" for entry in entries + entries[:1]))
+    assert sorted(collect_files(str(manifest))) == [(str(entries[0]), "a/take.wav"), (str(entries[1]), "b/take.wav")]
+
+def test_failed_files_are_reported_without_aborting(tmp_path, capsys):
+    make_library(tmp_path / "library")
+    output_dir = tmp_path / "encoded"
+    assert encode_batch(1, str(tmp_path / "library"), str(output_dir), "batch", workers=2) == 1
+    assert "FAILED" in next(line for line in capsys.readouterr().out.splitlines() if "broken.wav" in line)
+    assert sorted(os.listdir(output_dir)) == ["a", "b"]
+    assert decode_batch(1, str(output_dir), workers=2) == 0
+
+def test_jobs_that_raise_are_failed_rows(tmp_path, capsys):
+    make_library(tmp_path / "library")
+    blocked = tmp_path / "blocked"
+    blocked.write_text("a file where the output directory should be")
+    assert encode_batch(1, str(tmp_path / "library"), str(blocked), "batch", workers=2) == 3
+    assert capsys.readouterr().out.count("FAILED") == 3
@@ -0,0 +1,45 @@
+import os
+
+from cli.capacity_index import find_carriers, scan
+from tests.conftest import write_wav
+
+def test_scan_indexes_and_finds_carriers(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    write_wav(library / "short.wav", nframes=1000)
+    write_wav(library / "long.wav", nframes=5000)
+    index = str(tmp_path / "index.sqlite")
+
+    assert scan(str(library), index) == (2, 0, 0)
+    # Basic LSB stores one bit per byte of 16-bit stereo frames
+    assert find_carriers(index, 1, 100) == [(str(library / "short.wav"), 4000), (str(library / "long.wav"), 20000)]
+    assert find_carriers(index, 1, 5000) == [(str(library / "long.wav"), 20000)]
+    assert find_carriers(index, 1, 100, limit=1) == [(str(library / "short.wav"), 4000)]
+
+def test_rescan_refreshes_changed_and_drops_missing_files(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    write_wav(library / "short.wav", nframes=1000)
+    write_wav(library / "long.wav", nframes=5000)
+    index = str(tmp_path / "index.sqlite")
+    scan(str(library), index)
+
+    assert scan(str(library), index) == (0, 2, 0)
+    write_wav(library / "long.wav", nframes=500)
+    assert scan(str(library), index) == (1, 1, 0)
+    assert find_carriers(index, 1, 5000) == []
+
+    os.remove(library / "short.wav")
+    assert scan(str(library), index) == (0, 1, 0)
+    assert find_carriers(index, 1, 100) == [(str(library / "long.wav"), 2000)]
+
+def test_unreadable_files_are_counted_and_skipped(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    write_wav(library / "good.wav", nframes=1000)
+    (library / "corrupt.wav").write_bytes(b"not a wav file")
+    os.symlink(library / "missing.wav", library / "dangling.wav")
+    index = str(tmp_path / "index.sqlite")
+
+    assert scan(str(library), index) == (1, 0, 2)
+    assert find_carriers(index, 1, 1) == [(str(library / "good.wav"), 4000)]
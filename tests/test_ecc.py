@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from algorithms import ecc
+from algorithms.bit_packing import bits_to_message, message_bit_length, message_to_bits, payload_checked, payload_length_bits
+from algorithms.payload import pack_payload
+
+def codeword_area(frame, length):
+    """Returns the slice of a frame holding the interleaved codeword bits."""
+    return slice(ecc.FRAME_HEADER_BITS, ecc.FRAME_HEADER_BITS + length * ecc.CODEWORD_BITS)
+
+def test_every_byte_decodes_cleanly():
+    data, status = ecc.decode_tables()
+    codewords = ecc.encode_table()
+    assert len(set(codewords.tolist())) == 256
+    assert (data[codewords] == np.arange(256)).all()
+    assert (status[codewords] == ecc.STATUS_OK).all()
+
+def test_every_single_bit_error_is_corrected():
+    data, status = ecc.decode_tables()
+    codewords = ecc.encode_table().astype(np.int64)
+    for bit in range(ecc.CODEWORD_BITS):
+        damaged = codewords ^ (1 << bit)
+        assert (data[damaged] == np.arange(256)).all()
+        assert (status[damaged] == ecc.STATUS_CORRECTED).all()
+
+def test_every_double_bit_error_is_detected():
+    _, status = ecc.decode_tables()
+    codewords = ecc.encode_table().astype(np.int64)
+    for first in range(ecc.CODEWORD_BITS):
+        for second in range(first + 1, ecc.CODEWORD_BITS):
+            assert (status[codewords ^ (1 << first) ^ (1 << second)] == ecc.STATUS_UNCORRECTABLE).all()
+
+@pytest.mark.parametrize("data", [b"", b"x", bytes(range(256)) * 3])
+def test_frame_round_trip(data):
+    frame = ecc.protect(data)
+    assert len(frame) == ecc.frame_bits(len(data))
+    assert len(frame) % 8 == 0
+    assert ecc.is_protected(frame)
+    assert ecc.protected_length_bits(frame) == len(frame)
+    payload, stats = ecc.unprotect(frame)
+    assert payload == data
+    assert stats == {"codewords": len(data), "corrected": 0, "uncorrectable": 0, "header_bits_outvoted": 0}
+
+def test_one_error_per_codeword_is_corrected():
+    data = bytes(range(200))
+    frame = ecc.protect(data)
+    codewords = frame[codeword_area(frame, len(data))].reshape(ecc.CODEWORD_BITS, len(data))
+    codewords[np.arange(len(data)) % ecc.CODEWORD_BITS, np.arange(len(data))] ^= 1
+    payload, stats = ecc.unprotect(frame)
+    assert payload == data
+    assert stats["corrected"] == len(data)
+
+def test_interleaving_spreads_a_burst_over_codewords():
+    data = bytes(range(100))
+    frame = ecc.protect(data)
+    area = codeword_area(frame, len(data))
+    frame[area.start + 40:area.start + 40 + len(data)] ^= 1  # A burst as long as the payload
+    payload, stats = ecc.unprotect(frame)
+    assert payload == data
+    assert stats["uncorrectable"] == 0
+
+def test_header_is_majority_decoded():
+    frame = ecc.protect(b"header")
+    frame[0:ecc.FRAME_HEADER_BITS:ecc.REPETITION] ^= 1  # One copy of every header bit
+    assert ecc.is_protected(frame)
+    payload, stats = ecc.unprotect(frame)
+    assert payload == b"header"
+    assert stats["header_bits_outvoted"] == ecc.FRAME_HEADER_BITS // ecc.REPETITION
+
+def test_truncated_frame_is_rejected():
+    frame = ecc.protect(b"truncated")
+    with pytest.raises(ValueError, match="truncated"):
+        ecc.unprotect(frame[:ecc.FRAME_HEADER_BITS + 20])
+
+def test_plain_payloads_are_not_protected():
+    assert not ecc.is_protected(message_to_bits("plain", protect=False))
+
+def test_protected_message_survives_bit_errors():
+    message = "error-corrected ✓"
+    bits = message_to_bits(message, protect=True)
+    assert len(bits) == message_bit_length(message, protect=True)
+    assert payload_length_bits(bits[:120]) == len(bits)
+    assert payload_checked(bits[:120])
+    bits[ecc.FRAME_HEADER_BITS::17] ^= 1
+    assert bits_to_message(bits) == message
+
+def test_uncorrectable_damage_is_rejected():
+    payload = pack_payload(b"damaged beyond repair")
+    frame = ecc.protect(payload)
+    codewords = frame[codeword_area(frame, len(payload))].reshape(ecc.CODEWORD_BITS, len(payload))
+    codewords[list(ecc.DATA_POSITIONS[:2])] ^= 1  # Two data bit errors in every codeword
+    with pytest.raises(ValueError):  # The payload header or checksum check fails instead of returning a garbled message
+        bits_to_message(frame)
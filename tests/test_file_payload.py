@@ -0,0 +1,54 @@
+import io
+import os
+
+import pytest
+
+from cli.config import ALGORITHMS
+from cli.main import run_command
+
+FILE_ALGORITHMS = sorted(key for key in ALGORITHMS if 'encode_file' in ALGORITHMS[key])
+
+@pytest.mark.parametrize("algo_choice", FILE_ALGORITHMS)
+def test_file_round_trip(algo_choice, carrier, tmp_path):
+    algorithm = ALGORITHMS[algo_choice]
+    payload = os.urandom(3000)
+    (tmp_path / "payload.bin").write_bytes(payload)
+    output = str(tmp_path / "encoded.wav")
+    assert algorithm['encode_file'](carrier, output, str(tmp_path / "payload.bin"), block_frames=1000) == output
+    assert algorithm['decode_file'](output, str(tmp_path / "recovered.bin"), block_frames=777) == len(payload)
+    assert (tmp_path / "recovered.bin").read_bytes() == payload
+
+    sink = io.BytesIO()
+    assert algorithm['decode_file'](output, sink) == len(payload)
+    assert sink.getvalue() == payload
+
+@pytest.mark.parametrize("algo_choice", FILE_ALGORITHMS)
+def test_file_encode_in_place(algo_choice, carrier, tmp_path):
+    algorithm = ALGORITHMS[algo_choice]
+    size = os.path.getsize(carrier)
+    assert algorithm['encode_file'](carrier, carrier, io.BytesIO(b"hidden in place")) == carrier
+    assert os.path.getsize(carrier) == size
+    assert algorithm['decode_file'](carrier, str(tmp_path / "recovered.bin")) == len(b"hidden in place")
+    assert (tmp_path / "recovered.bin").read_bytes() == b"hidden in place"
+
+def test_corrupt_payload_leaves_no_output(carrier, tmp_path):
+    algorithm = ALGORITHMS[1]
+    output = str(tmp_path / "encoded.wav")
+    algorithm['encode_file'](carrier, output, io.BytesIO(os.urandom(2000)))
+    with open(output, 'r+b') as f:
+        f.seek(44 + 400)  # A carrier byte holding payload data, past the payload header
+        byte = f.read(1)[0]
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte ^ 1]))
+    assert algorithm['decode_file'](output, str(tmp_path / "recovered.bin")) is None
+    assert not (tmp_path / "recovered.bin").exists()
+    # A carrier without a payload fails the same way
+    assert algorithm['decode_file'](carrier, str(tmp_path / "recovered.bin")) is None
+    assert sorted(os.listdir(tmp_path)) == ["carrier.wav", "encoded.wav"]
+
+@pytest.mark.parametrize("command", [["encode-file", "payload.bin", "carrier.wav", "out.wav"], ["decode-file", "out.wav", "payload.bin"]])
+def test_ecc_is_rejected_for_file_payloads(command, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        run_command(["--ecc", *command, "-a", "1"])
+    assert exit_info.value.code == 2
+    assert "--ecc" in capsys.readouterr().err
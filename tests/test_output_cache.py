@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from cli import output_cache
+from cli.config import ALGORITHMS
+from tests.conftest import write_wav
+from utils.metrics import METRICS
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Enables the output cache in a fresh directory."""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv(output_cache.CACHE_DIR_ENV_VAR, str(directory))
+    monkeypatch.delenv(output_cache.CACHE_LINK_ENV_VAR, raising=False)
+    METRICS.reset()
+    return directory
+
+def counters():
+    return METRICS.snapshot()["counters"].get("output_cache", {})
+
+def cached_encode(carrier, output, message, algo_choice=1):
+    algorithm = ALGORITHMS[algo_choice]
+    return output_cache.cached_encode(algorithm, algorithm['encode'], carrier, output, message)
+
+def test_repeat_encode_is_a_hit(cache, carrier, tmp_path):
+    first, second = str(tmp_path / "first.wav"), str(tmp_path / "second.wav")
+    assert cached_encode(carrier, first, "cached") == first
+    assert counters().get("misses") == 1
+    assert cached_encode(carrier, second, "cached") == second
+    assert counters().get("hits") == 1
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert a.read() == b.read()
+    assert ALGORITHMS[1]['decode'](second) == "cached"
+
+def test_key_covers_message_algorithm_carrier_and_container(cache, carrier, tmp_path):
+    key = output_cache.cache_key(ALGORITHMS[1], carrier, "message", output_file="out.wav")
+    assert key == output_cache.cache_key(ALGORITHMS[1], carrier, "message", output_file="other.wav")
+    assert key != output_cache.cache_key(ALGORITHMS[1], carrier, "other message", output_file="out.wav")
+    assert key != output_cache.cache_key(ALGORITHMS[2], carrier, "message", output_file="out.wav")
+    assert key != output_cache.cache_key(ALGORITHMS[1], carrier, "message", output_file="out.aiff")
+    write_wav(carrier, seed=1)  # Rewriting the carrier changes its digest
+    assert key != output_cache.cache_key(ALGORITHMS[1], carrier, "message", output_file="out.wav")
+
+def test_disabled_cache_has_no_key(carrier, monkeypatch):
+    monkeypatch.delenv(output_cache.CACHE_DIR_ENV_VAR, raising=False)
+    assert output_cache.cache_key(ALGORITHMS[1], carrier, "message") is None
+
+def test_least_recently_used_entries_are_evicted(cache, carrier, tmp_path):
+    outputs = [str(tmp_path / f"out{index}.wav") for index in range(3)]
+    for index, output in enumerate(outputs):
+        cached_encode(carrier, output, f"message {index}")
+    entry_size = os.path.getsize(outputs[0])
+    keys = [output_cache.cache_key(ALGORITHMS[1], carrier, f"message {index}", output_file=outputs[0]) for index in range(3)]
+    # Mark the second entry as the least recently used
+    os.utime(output_cache.entry_paths(keys[1])[0], ns=(1, os.stat(output_cache.entry_paths(keys[1])[0]).st_mtime_ns))
+    assert output_cache.evict(2 * entry_size) == 1
+    assert [os.path.exists(output_cache.entry_paths(key)[0]) for key in keys] == [True, False, True]
+    assert counters().get("evictions") == 1
+
+def test_modified_entries_are_dropped(cache, carrier, tmp_path):
+    output = str(tmp_path / "out.wav")
+    cached_encode(carrier, output, "tampered")
+    audio_path, _ = output_cache.entry_paths(output_cache.cache_key(ALGORITHMS[1], carrier, "tampered", output_file=output))
+    with open(audio_path, 'ab') as f:
+        f.write(b"changed")
+    assert cached_encode(carrier, str(tmp_path / "again.wav"), "tampered") is not None
+    assert counters().get("hits") is None
+    assert ALGORITHMS[1]['decode'](str(tmp_path / "again.wav")) == "tampered"
+
+def test_linked_outputs_are_released_before_rewriting(cache, carrier, tmp_path, monkeypatch):
+    monkeypatch.setenv(output_cache.CACHE_LINK_ENV_VAR, "1")
+    first, second = str(tmp_path / "first.wav"), str(tmp_path / "second.wav")
+    cached_encode(carrier, first, "linked")
+    cached_encode(carrier, second, "linked")
+    assert os.stat(second).st_nlink > 1
+    cached_encode(carrier, second, "different")
+    assert ALGORITHMS[1]['decode'](second) == "different"
+    assert ALGORITHMS[1]['decode'](first) == "linked"
+    assert cached_encode(carrier, str(tmp_path / "third.wav"), "linked") is not None
+    assert ALGORITHMS[1]['decode'](str(tmp_path / "third.wav")) == "linked"
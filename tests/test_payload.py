@@ -0,0 +1,112 @@
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from algorithms.bit_packing import (
+    bits_to_message,
+    message_bit_length,
+    message_to_bits,
+    payload_checked,
+    payload_length_bits,
+)
+from algorithms.payload import (
+    CODEC_LZMA,
+    CODEC_RAW,
+    CODEC_ZLIB,
+    FORMAT_VERSION,
+    FORMAT_VERSION_UNCHECKED,
+    decode_varint,
+    encode_varint,
+    pack_payload,
+    parse_payload_header,
+    payload_size,
+    unpack_payload,
+)
+from cli.config import ALGORITHMS
+
+def legacy_bits(message):
+    """Bits of a payload written before the container: a 32-bit big-endian bit length and latin-1 bytes."""
+    data = message.encode('latin-1')
+    return np.unpackbits(np.frombuffer(struct.pack('>I', len(data) * 8) + data, dtype=np.uint8))
+
+def unchecked_payload(data):
+    """A 0x81 payload, written before the checksum trailer was added."""
+    return bytes([FORMAT_VERSION_UNCHECKED, CODEC_RAW]) + encode_varint(len(data)) + data
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 32, 2 ** 64 - 1])
+def test_varint_round_trip(value):
+    encoded = encode_varint(value)
+    assert decode_varint(encoded) == (value, len(encoded))
+
+def test_varint_rejects_truncated_and_overlong_input():
+    with pytest.raises(ValueError):
+        decode_varint(encode_varint(2 ** 20)[:-1])
+    with pytest.raises(ValueError):
+        decode_varint(b'\x80' * 11)
+
+@pytest.mark.parametrize("data, codec", [
+    (b"short", CODEC_RAW),
+    (b"compressible " * 20, CODEC_ZLIB),
+    (bytes(range(256)) * 200, CODEC_LZMA),
+])
+def test_payload_round_trip_picks_codec(data, codec):
+    payload = pack_payload(data)
+    assert payload[0] == FORMAT_VERSION
+    assert parse_payload_header(payload)[0] == codec
+    assert payload_size(payload) == len(payload)
+    assert unpack_payload(payload) == data
+
+def test_payload_checksum_covers_stored_bytes():
+    payload = pack_payload(b"short")
+    _, header_size, length, checksum_size = parse_payload_header(payload)
+    assert payload[header_size + length:] == zlib.crc32(b"short").to_bytes(checksum_size, 'big')
+
+@pytest.mark.parametrize("index", [3, 5, -1])
+def test_corrupted_payload_is_rejected(index):
+    payload = bytearray(pack_payload(b"hello world"))
+    payload[index] ^= 0x01
+    with pytest.raises(ValueError, match="checksum"):
+        unpack_payload(bytes(payload))
+
+def test_malformed_payloads_are_rejected():
+    payload = pack_payload(b"hello world")
+    with pytest.raises(ValueError, match="truncated"):
+        unpack_payload(payload[:-1])
+    with pytest.raises(ValueError, match="version"):
+        unpack_payload(b'\x83' + payload[1:])
+    with pytest.raises(ValueError, match="codec"):
+        unpack_payload(payload[:1] + b'\x07' + payload[2:])
+
+def test_unchecked_payload_still_decodes():
+    assert unpack_payload(unchecked_payload(b"old message")) == b"old message"
+
+@pytest.mark.parametrize("message", ["", "secret", "ünïcødé ✓", "x" * 5000])
+def test_message_bits_round_trip(message):
+    bits = message_to_bits(message, protect=False)
+    assert len(bits) == message_bit_length(message, protect=False)
+    assert payload_length_bits(bits[:96]) == len(bits)
+    assert payload_checked(bits[:96])
+    assert bits_to_message(bits) == message
+
+def test_legacy_bits_decode_unverified():
+    bits = legacy_bits("legacy message")
+    assert payload_length_bits(bits[:96]) == len(bits)
+    assert not payload_checked(bits[:96])
+    assert bits_to_message(bits) == "legacy message"
+
+def test_unchecked_bits_decode_unverified():
+    bits = np.unpackbits(np.frombuffer(unchecked_payload("old".encode('utf-8')), dtype=np.uint8))
+    assert not payload_checked(bits)
+    assert bits_to_message(bits) == "old"
+
+@pytest.mark.parametrize("algo_choice", sorted(ALGORITHMS))
+def test_algorithm_round_trip(algo_choice, carrier, tmp_path):
+    algorithm = ALGORITHMS[algo_choice]
+    output = str(tmp_path / "encoded.wav")
+    assert algorithm['encode'](carrier, output, "round trip ✓") == output
+    assert algorithm['decode'](output) == "round trip ✓"
+    assert algorithm['decode_streaming'](output) == "round trip ✓"
+    assert algorithm['decode_mmap'](output) == "round trip ✓"
+    assert algorithm['probe'](output) == (len(message_to_bits("round trip ✓", protect=False)), True)
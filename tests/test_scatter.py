@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from algorithms import scatter_lsb_steganography as scatter
+from algorithms.scatter import KeyedPermutation, embed_scattered, extract_scattered
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000, 4099])
+def test_permutation_is_a_bijection(size):
+    permutation = KeyedPermutation("key", size)
+    positions = permutation.positions(0, size)
+    assert sorted(positions.tolist()) == list(range(size))
+    assert (permutation.indices(0, size)[positions] == np.arange(size)).all()
+
+def test_slices_match_the_whole_permutation():
+    permutation = KeyedPermutation("key", 5000)
+    whole = permutation.positions(0, 5000)
+    assert (np.concatenate([permutation.positions(start, start + 700) for start in range(0, 5000, 700)]) == whole).all()
+
+def test_keys_pick_different_positions():
+    assert (KeyedPermutation("one", 5000).positions(0, 100) != KeyedPermutation("two", 5000).positions(0, 100)).any()
+
+def test_embed_and_extract_scattered():
+    carrier = np.random.default_rng(0).integers(0, 256, 3000, dtype=np.uint8)
+    bits = np.random.default_rng(1).integers(0, 2, 500, dtype=np.uint8)
+    permutation = KeyedPermutation("key", len(carrier))
+    embed_scattered(carrier, bits, permutation)
+    assert (extract_scattered(carrier, permutation, 0, len(bits)) == bits).all()
+    assert (extract_scattered(carrier, permutation, 100, 300) == bits[100:300]).all()
+
+def test_empty_carrier_is_rejected():
+    with pytest.raises(ValueError, match="no positions"):
+        KeyedPermutation("key", 0)
+
+def test_key_round_trip_and_mismatch(carrier, tmp_path):
+    output = str(tmp_path / "encoded.wav")
+    assert scatter.encode(carrier, output, "keyed", key="right key") == output
+    for decode in (scatter.decode, scatter.decode_streaming, scatter.decode_mmap):
+        assert decode(output, key="right key") == "keyed"
+        assert decode(output, key="wrong key") is None
+    assert scatter.probe(output, key="right key") is not None
+    assert scatter.probe(output, key="wrong key") is None
+
+def test_key_from_the_environment(carrier, tmp_path, monkeypatch):
+    output = str(tmp_path / "encoded.wav")
+    monkeypatch.setenv(scatter.KEY_ENV_VAR, "environment key")
+    assert scatter.encode_streaming(carrier, output, "from the environment") == output
+    assert scatter.decode(output, key="environment key") == "from the environment"
+    assert scatter.decode(output, key=scatter.DEFAULT_KEY) is None
+
+def test_mmap_accepts_workers(carrier, tmp_path):
+    output = str(tmp_path / "encoded.wav")
+    assert scatter.encode_mmap(carrier, output, "threads", workers=4, key="key") == output
+    assert scatter.decode_mmap(output, workers=4, key="key") == "threads"
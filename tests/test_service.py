@@ -0,0 +1,80 @@
+import http.client
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from cli.service import JobPool, ServiceHandler
+from tests.conftest import write_wav
+
+@pytest.fixture
+def service(tmp_path):
+    """A service on an ephemeral port with one worker and one pending job at most, serving files below ``tmp_path``."""
+    write_wav(tmp_path / "carrier.wav")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ServiceHandler)
+    server.pool = JobPool(workers=1, max_pending=1)
+    server.root = os.path.realpath(tmp_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+def post(server, endpoint, body, content_type="application/json"):
+    """Posts a request and returns the status, the headers and the decoded JSON body."""
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    connection.request("POST", endpoint, data, {"Content-Type": content_type})
+    response = connection.getresponse()
+    result = response.status, response.headers, json.loads(response.read())
+    connection.close()
+    return result
+
+def test_encode_and_decode(service, tmp_path):
+    status, _, body = post(service, "/encode", {"algorithm": 1, "input": "carrier.wav", "output": "out/encoded.wav", "message": "served"})
+    assert status == 200 and body["ok"]
+    assert body["output"] == str(tmp_path / "out" / "encoded.wav")
+    status, _, body = post(service, "/decode", {"algorithm": 1, "input": "out/encoded.wav"})
+    assert (status, body["message"]) == (200, "served")
+
+def test_failed_job_is_unprocessable(service):
+    status, _, body = post(service, "/decode", {"algorithm": 1, "input": "missing.wav"})
+    assert status == 422 and not body["ok"]
+
+def test_only_json_requests_are_accepted(service, tmp_path):
+    request = json.dumps({"algorithm": 1, "input": "carrier.wav", "output": "plain.wav", "message": "x"}).encode("utf-8")
+    status, _, _ = post(service, "/encode", request, content_type="text/plain")
+    assert status == 415
+    assert not (tmp_path / "plain.wav").exists()
+    assert post(service, "/decode", {"algorithm": 1, "input": "carrier.wav"}, content_type="application/json; charset=utf-8")[0] == 422
+
+@pytest.mark.parametrize("body", [
+    {"algorithm": 1, "input": "carrier.wav", "output": "/tmp/escaped.wav", "message": "x"},
+    {"algorithm": 1, "input": "carrier.wav", "output": "../escaped.wav", "message": "x"},
+    {"algorithm": 1, "input": "out/../../escaped.wav"},
+    {"algorithm": 1, "input": "link/escaped.wav"},
+    {"algorithm": 9, "input": "carrier.wav"},
+    {"algorithm": 1, "input": 42},
+    ["not", "an", "object"],
+])
+def test_invalid_requests_are_rejected(service, tmp_path, body):
+    os.symlink(tmp_path.parent, tmp_path / "link")
+    endpoint = "/encode" if isinstance(body, dict) and "output" in body else "/decode"
+    status, _, response = post(service, endpoint, body)
+    assert status == 400
+    assert "Invalid request" in response["error"]
+
+def test_full_pool_answers_503(service):
+    blocker = threading.Thread(target=service.pool.run, args=(time.sleep, 1))
+    blocker.start()
+    while service.pool.pending == 0:
+        time.sleep(0.01)
+    status, headers, _ = post(service, "/decode", {"algorithm": 1, "input": "carrier.wav"})
+    blocker.join()
+    assert status == 503
+    assert headers["Retry-After"] == "1"
+    assert post(service, "/decode", {"algorithm": 1, "input": "carrier.wav"})[0] == 422
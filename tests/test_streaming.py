@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from cli.config import ALGORITHMS
+from tests.conftest import write_wav
+
+@pytest.mark.parametrize("algo_choice", sorted(ALGORITHMS))
+def test_streaming_matches_in_memory_encode(algo_choice, carrier, tmp_path):
+    algorithm = ALGORITHMS[algo_choice]
+    in_memory, streamed = str(tmp_path / "in_memory.wav"), str(tmp_path / "streamed.wav")
+    assert algorithm['encode'](carrier, in_memory, "streamed message") == in_memory
+    # Small blocks spread the payload over several blocks
+    assert algorithm['encode_streaming'](carrier, streamed, "streamed message", block_frames=1000) == streamed
+    with open(in_memory, 'rb') as expected, open(streamed, 'rb') as actual:
+        assert actual.read() == expected.read()
+    assert algorithm['decode_streaming'](streamed, block_frames=777) == "streamed message"
+
+@pytest.mark.parametrize("algo_choice", sorted(ALGORITHMS))
+def test_streaming_encode_in_place(algo_choice, carrier):
+    algorithm = ALGORITHMS[algo_choice]
+    size = os.path.getsize(carrier)
+    assert algorithm['encode_streaming'](carrier, carrier, "in place", block_frames=1000) == carrier
+    assert os.path.getsize(carrier) == size
+    assert algorithm['decode'](carrier) == "in place"
+    assert os.listdir(os.path.dirname(carrier)) == ["carrier.wav"]  # No staging file is left behind
+
+def test_message_too_large_leaves_output_untouched(tmp_path):
+    write_wav(tmp_path / "short.wav", nframes=100)
+    output = tmp_path / "encoded.wav"
+    encode_streaming = ALGORITHMS[1]['encode_streaming']
+    # Random text, so the message cannot shrink to fit
+    message = os.urandom(500).hex()
+    assert encode_streaming(str(tmp_path / "short.wav"), str(output), message) is None
+    assert not output.exists()
+
+    output.write_bytes(b"earlier output")
+    assert encode_streaming(str(tmp_path / "short.wav"), str(output), message) is None
+    assert output.read_bytes() == b"earlier output"
+    assert sorted(os.listdir(tmp_path)) == ["encoded.wav", "short.wav"]
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRIC_PREFIX = "steganography"
+
+class Stopwatch:
+    """
+    Splits one call of an operation into consecutive phases.
+
+    Each ``lap`` charges the time since the previous lap (or since the stopwatch was
+    started) to the named phase, so instrumenting a function only takes one line per phase.
+    """
+
+    def __init__(self, metrics, operation):
+        self._metrics = metrics
+        self._operation = operation
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Charges the time since the previous lap to ``phase``."""
+        now = time.perf_counter()
+        self._metrics.record(self._operation, phase, now - self._last)
+        self._last = now
+
+    def count(self, name, value=1):
+        """Adds ``value`` to a counter of this operation."""
+        self._metrics.add(self._operation, name, value)
+
+class Metrics:
+    """Thread-safe per-process totals of phase timings and counters, keyed by operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drops everything recorded so far."""
+        with self._lock:
+            self._seconds = defaultdict(float)
+            self._runs = defaultdict(int)
+            self._counters = defaultdict(int)
+
+    def record(self, operation, phase, seconds):
+        """Adds one timed run of a phase."""
+        with self._lock:
+            self._seconds[operation, phase] += seconds
+            self._runs[operation, phase] += 1
+
+    def add(self, operation, name, value=1):
+        """Adds ``value`` to a counter."""
+        with self._lock:
+            self._counters[operation, name] += value
+
+    def stopwatch(self, operation):
+        """Starts timing one call of an operation and counts the call."""
+        self.add(operation, "calls")
+        return Stopwatch(self, operation)
+
+    @contextmanager
+    def timer(self, operation, phase):
+        """Times the enclosed block as one run of a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, phase, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Returns everything recorded so far as plain data.
+
+        :return: Dictionary with ``phases`` (operation -> phase -> seconds and runs) and ``counters`` (operation -> name -> value)
+        """
+        with self._lock:
+            phases = defaultdict(dict)
+            for (operation, phase), seconds in self._seconds.items():
+                phases[operation][phase] = {"seconds": seconds, "runs": self._runs[operation, phase]}
+            counters = defaultdict(dict)
+            for (operation, name), value in self._counters.items():
+                counters[operation][name] = value
+        return {"phases": dict(phases), "counters": dict(counters)}
+
+    def merge(self, snapshot):
+        """Adds a snapshot taken in another process, e.g. a worker of a process pool."""
+        with self._lock:
+            for operation, phases in snapshot["phases"].items():
+                for phase, totals in phases.items():
+                    self._seconds[operation, phase] += totals["seconds"]
+                    self._runs[operation, phase] += totals["runs"]
+            for operation, counters in snapshot["counters"].items():
+                for name, value in counters.items():
+                    self._counters[operation, name] += value
+
+    def to_json(self):
+        """Returns the snapshot as a JSON document."""
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Returns the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_phase_seconds_total Time spent in each phase of an operation.",
+            f"# TYPE {METRIC_PREFIX}_phase_seconds_total counter",
+        ]
+        for operation, phases in sorted(snapshot["phases"].items()):
+            for phase, totals in sorted(phases.items()):
+                lines.append(f'{METRIC_PREFIX}_phase_seconds_total{{operation="{operation}",phase="{phase}"}} {totals["seconds"]:.9f}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_phase_runs_total Number of timed runs of each phase of an operation.",
+            f"# TYPE {METRIC_PREFIX}_phase_runs_total counter",
+        ]
+        for operation, phases in sorted(snapshot["phases"].items()):
+            for phase, totals in sorted(phases.items()):
+                lines.append(f'{METRIC_PREFIX}_phase_runs_total{{operation="{operation}",phase="{phase}"}} {totals["runs"]}')
+
+        names = sorted({name for counters in snapshot["counters"].values() for name in counters})
+        for name in names:
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            for operation, counters in sorted(snapshot["counters"].items()):
+                if name in counters:
+                    lines.append(f'{METRIC_PREFIX}_{name}_total{{operation="{operation}"}} {counters[name]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path):
+        """Writes the snapshot to a file, in Prometheus format for ``.prom``/``.txt`` files and as JSON otherwise."""
+        text = self.to_prometheus() if file_path.endswith((".prom", ".txt")) else self.to_json()
+        with open(file_path, 'w') as f:
+            f.write(text)
+
+# Process-wide metrics shared by all algorithms
+METRICS = Metrics()
+
+def run_with_metrics(job, *args):
+    """
+    Runs a job in a worker process and returns its result together with the metrics it recorded.
+
+    :param job: Top-level worker function
+    :param args: Arguments passed to the job
+    :return: Tuple of (job result, metrics snapshot) for ``METRICS.merge`` in the parent process
+    """
+    METRICS.reset()
+    result = job(*args)
+    return result, METRICS.snapshot()
@@ -0,0 +1,35 @@
+import cProfile
+import sys
+import tracemalloc
+
+from utils.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+def run_profiled(func, profile_path=None, tracemalloc_top=0):
+    """
+    Runs a function under the opt-in profilers.
+
+    Only the calling process is profiled; work done in worker processes is not included.
+
+    :param func: Function to run without arguments
+    :param profile_path: Write cProfile statistics to this file (open with ``python -m pstats`` or snakeviz)
+    :param tracemalloc_top: Print this many top allocation sites and the peak traced memory to stderr
+    :return: The function's return value
+    """
+    if tracemalloc_top:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if profile_path else None
+    try:
+        return profiler.runcall(func) if profiler else func()
+    finally:
+        if profiler:
+            profiler.dump_stats(profile_path)
+            logger.info(f"cProfile statistics written to {profile_path}")
+        if tracemalloc_top:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"\nPeak traced memory: {peak / 1e6:.1f} MB. Top {tracemalloc_top} allocation sites:", file=sys.stderr)
+            for statistic in snapshot.statistics('lineno')[:tracemalloc_top]:
+                print(f"  {statistic}", file=sys.stderr)